@@ -13,20 +13,34 @@ def xgcd(x, y):
 
 
 class BaseFieldElement:
+    # operations with an extension field element on the right are left to
+    # that element's reflected operator, which handles mixed arithmetic.
+    # Elements are immutable: small constants are shared, see
+    # `BaseField.__call__`, so never assign to `value` or `field`.
+    __slots__ = ("value", "field")
+
     def __init__(self, value, field):
         self.value = value
         self.field = field
 
     def __add__(self, right):
+        if type(right) != BaseFieldElement:
+            return NotImplemented
         return self.field.add(self, right)
 
     def __mul__(self, right):
+        if type(right) != BaseFieldElement:
+            return NotImplemented
         return self.field.multiply(self, right)
 
     def __sub__(self, right):
+        if type(right) != BaseFieldElement:
+            return NotImplemented
         return self.field.subtract(self, right)
 
     def __truediv__(self, right):
+        if type(right) != BaseFieldElement:
+            return NotImplemented
         return self.field.divide(self, right)
 
     def __neg__(self):
@@ -37,15 +51,11 @@ class BaseFieldElement:
 
     # modular exponentiation -- be sure to encapsulate in parentheses!
     def __xor__(self, exponent):
-        acc = BaseFieldElement(1, self.field)
-        val = BaseFieldElement(self.value, self.field)
-        for i in reversed(range(len(bin(exponent)[2:]))):
-            acc = acc * acc
-            if (1 << i) & exponent != 0:
-                acc = acc * val
-        return acc
+        return BaseFieldElement(pow(self.value, exponent, self.field.p), self.field)
 
     def __eq__(self, other):
+        if type(other) != BaseFieldElement:
+            return NotImplemented
         return self.value == other.value
 
     def __neq__(self, other):
@@ -74,17 +84,26 @@ class BaseFieldElement:
 
 
 class BaseField:
+    # elements with values below this are interned
+    num_constants = 256
+
     def __init__(self, p):
         self.p = p
+        self.constants = [BaseFieldElement(i, self)
+                          for i in range(min(p, BaseField.num_constants))]
+
+    def __reduce__(self):
+        # the constants are rebuilt rather than pickled
+        return (BaseField, (self.p,))
 
     def lift(self, bfe):
         return bfe
 
     def zero(self):
-        return BaseFieldElement(0, self)
+        return self.constants[0]
 
     def one(self):
-        return BaseFieldElement(1, self)
+        return self.constants[1]
 
     def multiply(self, left, right):
         return BaseFieldElement((left.value * right.value) % self.p, self)
@@ -127,11 +146,7 @@ class BaseField:
             # = 7^4294967295 mod p
             # = 7*(3 * 5 * 17 * 257 * 65537) mod p
             root = BaseFieldElement(1753635133440165772, self)
-            order = 1 << 32
-            while order != n:
-                root = root ^ 2
-                order = order/2
-            return root
+            return root ^ ((1 << 32) // n)
         else:
             assert(False), "Unknown field, can't return root of unity."
 
@@ -142,4 +157,65 @@ class BaseField:
         return BaseFieldElement(acc % self.p, self)
 
     def __call__(self, integer):
-        return BaseFieldElement(integer % self.p, self)
+        integer = integer % self.p
+        if integer < BaseField.num_constants:
+            return self.constants[integer]
+        return BaseFieldElement(integer, self)
+
+    def batch_inverse(self, elements):
+        """Inverses of the given nonzero elements, at the cost of one
+        inversion. The running products are accumulated on the integer
+        values, and elements are only built for the result."""
+        p = self.p
+        products = []
+        acc = 1
+        for e in elements:
+            acc = acc * e.value % p
+            products += [acc]
+        acc = self.inverse(BaseFieldElement(acc, self)).value
+        inverses = [None] * len(elements)
+        for i in reversed(range(1, len(elements))):
+            inverses[i] = BaseFieldElement(acc * products[i-1] % p, self)
+            acc = acc * elements[i].value % p
+        if len(elements) > 0:
+            inverses[0] = BaseFieldElement(acc, self)
+        return inverses
+
+
+class PowerTable:
+    """The points `offset * base^i` for 0 <= i < order, for a base field
+    element `base` of the given order. An index i is split as
+    i = low + high * 2^window, so that every point is one product of an
+    entry of the table of `base^low` and one of the table of
+    `offset * base^(high * 2^window)`; both tables hold about sqrt(order)
+    integers."""
+
+    def __init__(self, base, order, offset=None):
+        self.field = base.field
+        self.order = order
+        self.window = (len(bin(order - 1)) - 1) // 2
+        p = self.field.p
+
+        self.low = [1]
+        for i in range(1, min(1 << self.window, order)):
+            self.low += [self.low[-1] * base.value % p]
+        self.high = [1 if offset is None else offset.value]
+        step = pow(base.value, 1 << self.window, p)
+        for i in range(1, -(-order >> self.window)):
+            self.high += [self.high[-1] * step % p]
+
+    def value(self, index):
+        # the point with the given index, as an integer
+        index = index % self.order
+        return self.low[index & ((1 << self.window) - 1)] * self.high[index >> self.window] % self.field.p
+
+    def __call__(self, index):
+        return BaseFieldElement(self.value(index), self.field)
+
+    def values(self):
+        # all points in order, as integers
+        p = self.field.p
+        return [h * l % p for h in self.high for l in self.low][:self.order]
+
+    def list(self):
+        return [BaseFieldElement(v, self.field) for v in self.values()]
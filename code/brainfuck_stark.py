@@ -10,18 +10,71 @@ from memory_table import MemoryTable
 from permutation_argument import PermutationArgument
 from processor_table import ProcessorTable
 from salted_merkle import SaltedMerkle
+from randomness import RandomStream
+from table import Table, ZerofierCache, quotient_values
+from shared_codewords import SharedCodewords
+from verifying_key import VerifyingKey
+from prover_key import ProverKey
 from univariate import *
 from multivariate import *
 from ntt import *
 from functools import reduce
+from concurrent.futures import ProcessPoolExecutor
 import os
 
 
+# verifier shared by all proofs handled in one batch-verification worker
+batch_verifier = None
+
+
+def initialize_batch_verifier(stark):
+    global batch_verifier
+    batch_verifier = stark
+
+
+def verify_in_batch(proof):
+    # a malformed proof must not take down the whole batch. Unpickling
+    # reports malformed data with arbitrary exception types, and a proof
+    # that unpickles to objects of the wrong type or shape fails wherever
+    # the verifier first uses them, so any exception rejects the proof
+    try:
+        return batch_verifier.verify(proof)
+    except Exception:
+        return False
+
+
+quotient_fields = None
+
+
+def initialize_quotient_worker(field, xfield):
+    global quotient_fields
+    quotient_fields = (field, xfield)
+
+
+def compute_quotient_chunk(task):
+    # buffers are attached for one task only, so that a worker never keeps
+    # a buffer alive after the prover has released it
+    codewords_name, codewords_layout, quotients_name, quotients_layout, job, quotient_index, start, stop = task
+    field, xfield = quotient_fields
+    mpo, columns, zerofier_column, shift = job
+    codewords = SharedCodewords.attach(
+        codewords_name, codewords_layout, field, xfield)
+    quotients = SharedCodewords.attach(
+        quotients_name, quotients_layout, field, xfield)
+    try:
+        values = quotient_values(mpo, [codewords[j] for j in columns],
+                                 codewords[zerofier_column], xfield, start, stop, shift)
+        quotients[quotient_index].write(start, values)
+    finally:
+        codewords.close()
+        quotients.close()
+
+
 class BrainfuckStark:
     field = BaseField.main()
     xfield = ExtensionField.main()
 
-    def __init__(self, running_time, memory_length, program, input_symbols, output_symbols):
+    def __init__(self, running_time, memory_length, program, input_symbols, output_symbols, verifying_key=None, compress=False, grouped=False):
         # set fields of computational integrity claim
         self.running_time = running_time
         self.memory_length = memory_length
@@ -43,7 +96,22 @@ class BrainfuckStark:
         assert (self.num_colinearity_checks * len(bin(self.expansion_factor)
                                                   [3:]) >= self.security_level), "number of colinearity checks times log of expansion factor must be at least security level"
 
-        self.num_randomizers = 1  # TODO: self.security_level
+        # every column interpolant is masked by a random multiple of its
+        # trace domain's zerofier with this many coefficients, see
+        # Table.interpolate_columns. The prover opens every column at
+        # security_level indices, each at offset 0 and at every distinct
+        # unit distance, i.e. at most once more per distinct table height;
+        # as long as there are more random coefficients than opened points,
+        # the openings cannot determine the mask. One more security_level
+        # worth of coefficients is kept as margin.
+        heights = set(Table.roundup_npo2(length) for length in [
+            running_time, running_time + len(program), memory_length, len(input_symbols), len(output_symbols)])
+        self.num_randomizers = self.security_level * (2 + len(heights))
+
+        # open Merkle trees with batched authentication paths, and commit
+        # to FRI codewords with leafs that hold a whole folding coset
+        self.compress = compress
+        self.grouped = grouped
 
         # instantiate table objects
         order = 1 << 32
@@ -81,27 +149,29 @@ class BrainfuckStark:
         self.evaluation_arguments = [
             input_evaluation, output_evaluation, program_evaluation]
 
-        # compute fri domain length
-        self.max_degree = 1
-        for table in self.tables:
-            # Using one() here might lead to syzygies in weird edge cases,
-            # but that shouldn't be the case for Brainfuck though.
-            for air in table.transition_constraints_ext([self.xfield.one()] * 11):
-                degree_bounds = [table.interpolant_degree()] * \
-                    table.full_width * 2
-                degree = air.symbolic_degree_bound(
-                    degree_bounds) - (table.height - 1)
-                if self.max_degree < degree:
-                    self.max_degree = degree
-
-        self.max_degree = BrainfuckStark.roundup_npo2(self.max_degree) - 1
-        fri_domain_length = (self.max_degree+1) * self.expansion_factor
+        # compute degree bounds and fri domain length, unless known already
+        if verifying_key == None:
+            verifying_key = VerifyingKey.derive(self)
+        assert (verifying_key.identifier == VerifyingKey.identify(program, running_time, memory_length, len(input_symbols), len(
+            output_symbols))), "verifying key was derived for a different claim"
+        assert (verifying_key.parameters ==
+                self.parameters()), "verifying key was derived for different parameters"
+        self.verifying_key = verifying_key
+        self.max_degree = verifying_key.max_degree
+        fri_domain_length = verifying_key.fri_domain_length
 
         # instantiate self.fri object
         generator = BrainfuckStark.field.generator()
         omega = BrainfuckStark.field.primitive_nth_root(fri_domain_length)
         self.fri = Fri(generator, omega, fri_domain_length,
-                       self.expansion_factor, self.num_colinearity_checks, self.xfield)
+                       self.expansion_factor, self.num_colinearity_checks, self.xfield, self.compress, self.grouped)
+
+    def parameters(self):
+        return (self.expansion_factor, self.security_level, self.num_randomizers)
+
+    def prover_profile(self):
+        # everything the prover's setup data depends on
+        return (self.parameters(), self.fri.domain.length, tuple(table.height for table in self.tables))
 
     def get_terminals(self) -> List[ExtensionFieldElement]:
         terminals = [self.processor_table.instruction_permutation_terminal,
@@ -131,7 +201,106 @@ class BrainfuckStark:
             return 1
         return 1 << (len(bin(integer-1)[2:]))
 
-    def prove(self, program, processor_matrix, memory_matrix, instruction_matrix, input_matrix, output_matrix, proof_stream=None):
+    def accumulate(self, combination_codeword, weight, codeword):
+        for j in range(self.fri.domain.length):
+            combination_codeword[j] = combination_codeword[j] + \
+                weight * codeword[j]
+
+    def accumulate_shifted(self, combination_codeword, weights, codeword, shift):
+        """Add `weights[0] * codeword + weights[1] * x^shift * codeword` to
+        `combination_codeword` in place, where `shift` is the exponent from
+        the verifying key that lifts `codeword` to `self.max_degree`."""
+        # the debug check interpolates every codeword, base field ones
+        # included, once per term, which dominates the cost of a DEBUG run
+        if os.environ.get('DEBUG') is not None:
+            degree_bound = self.max_degree - shift
+            interpolated = self.fri.domain.xinterpolate(
+                [self.xfield.lift(c) for c in codeword])
+            assert (interpolated.degree() == -1 or interpolated.degree() <=
+                    degree_bound), f"interpolated degree is {interpolated.degree()} but > degree bound = {degree_bound}"
+        powers = self.fri.domain.powers(shift)
+        unshifted_weight, shifted_weight = weights
+        # base field codewords are combined without lifting them
+        for j in range(self.fri.domain.length):
+            combination_codeword[j] = combination_codeword[j] + \
+                (unshifted_weight + shifted_weight * powers[j]) * codeword[j]
+
+    def table_quotients(self, challenges, terminals, zerofiers, num_workers=1):
+        """Yield the quotient codewords of all tables, in order. With
+        `num_workers` other than 1, every (quotient, domain chunk) pair is a
+        separate task for a pool of that many processes (None: one per core).
+        Tables are handled one at a time: a table's codewords and zerofier
+        inverses are copied into shared memory, and its quotients are
+        computed in batches of `num_workers`, which workers write straight
+        into a shared output buffer. Every buffer is released as soon as its
+        quotients have been yielded, so memory stays bounded by one table and
+        one batch."""
+        if num_workers == 1:
+            yield from (quotient for table in self.tables for quotient in table.all_quotients(
+                self.fri.domain, table.codewords, challenges, terminals, zerofiers))
+            return
+
+        num_workers = num_workers or os.cpu_count()
+        length = self.fri.domain.length
+        chunk_length = -(-length // num_workers)
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=initialize_quotient_worker, initargs=(self.field, self.xfield)) as executor:
+            for table in self.tables:
+                # jobs refer to codewords by their index in the shared buffer
+                codewords = list(table.codewords)
+                zerofier_columns = dict()
+                jobs = []
+                for mpo, zerofier_inverse, shift in table.quotient_constraints(self.fri.domain, challenges, terminals, zerofiers):
+                    if id(zerofier_inverse) not in zerofier_columns:
+                        zerofier_columns[id(zerofier_inverse)] = len(codewords)
+                        codewords += [zerofier_inverse]
+                    jobs += [(mpo, range(table.full_width),
+                              zerofier_columns[id(zerofier_inverse)], shift)]
+                if len(jobs) == 0:
+                    continue
+
+                shared_codewords = SharedCodewords.create(
+                    codewords, self.field, self.xfield)
+                del codewords
+                try:
+                    for first in range(0, len(jobs), num_workers):
+                        batch = jobs[first:first+num_workers]
+                        shared_quotients = SharedCodewords.allocate(
+                            [(3, length)] * len(batch), self.field, self.xfield)
+                        try:
+                            tasks = [(shared_codewords.name(), shared_codewords.layout, shared_quotients.name(), shared_quotients.layout, job, i, start, min(start + chunk_length, length))
+                                     for i, job in enumerate(batch) for start in range(0, length, chunk_length)]
+                            list(executor.map(compute_quotient_chunk, tasks))
+                            for i in range(len(batch)):
+                                yield shared_quotients.codeword(i)
+                        finally:
+                            shared_quotients.close()
+                finally:
+                    shared_codewords.close()
+
+    def prove(self, program, processor_matrix, memory_matrix, instruction_matrix, input_matrix, output_matrix, proof_stream=None, prover_key=None, num_workers=1, seed=None):
+        """Prove the execution given by the matrices. With a prover key,
+        the FRI domain takes its power tables and zerofiers from the key
+        for the duration of this call only, and whatever is computed during
+        the proof is added to the key."""
+        matrices = (processor_matrix, memory_matrix, instruction_matrix,
+                    input_matrix, output_matrix)
+        zerofiers = ZerofierCache(self.fri.domain)
+        if prover_key == None:
+            return self.prove_with_zerofiers(program, *matrices, proof_stream, zerofiers, num_workers, seed)
+
+        assert (prover_key.profile == self.prover_profile()
+                ), "prover key was created for a different profile"
+        domain = self.fri.domain
+        power_tables, subgroup_zerofiers = domain.power_tables, domain.zerofiers
+        domain.power_tables = prover_key.power_tables
+        domain.zerofiers = prover_key.subgroup_zerofiers
+        zerofiers.inverses = prover_key.zerofier_inverses
+        try:
+            return self.prove_with_zerofiers(program, *matrices, proof_stream, zerofiers, num_workers, seed)
+        finally:
+            domain.power_tables, domain.zerofiers = power_tables, subgroup_zerofiers
+
+    def prove_with_zerofiers(self, program, processor_matrix, memory_matrix, instruction_matrix, input_matrix, output_matrix, proof_stream, zerofiers, num_workers, seed):
         running_time = len(processor_matrix)
         assert (running_time + len(program) == len(instruction_matrix))
 
@@ -153,6 +322,10 @@ class BrainfuckStark:
         if proof_stream == None:
             proof_stream = ProofStream()
 
+        # all salts and randomizers of this proof are read from one stream;
+        # a fixed seed makes the proof reproducible
+        randomness = RandomStream(seed)
+
         # compute root of unity of large enough order
         # for fast (NTT-based) polynomial arithmetic
         omega = self.fri.domain.omega
@@ -162,60 +335,52 @@ class BrainfuckStark:
             order = order // 2
 
         randomizer_codewords = []
-        randomizer_polynomial = Polynomial([self.xfield.sample(os.urandom(
-            3*9)) for i in range(self.max_degree+1)])
+        randomizer_polynomial = Polynomial(randomness.sample(
+            self.xfield, self.max_degree+1, 3*9))
         randomizer_codeword = self.fri.domain.xevaluate(
             randomizer_polynomial)
         randomizer_codewords += [randomizer_codeword]
 
         base_codewords = reduce(
-            lambda x, y: x+y, [table.lde(self.fri.domain) for table in self.tables], [])
+            lambda x, y: x+y, [table.lde(self.fri.domain, randomness) for table in self.tables], [])
         all_base_codewords = randomizer_codewords + base_codewords
 
-        base_degree_bounds = reduce(
-            lambda x, y: x+y, [[table.interpolant_degree()] * table.base_width for table in self.tables], [])
-
-        zipped_codeword = list(zip(*all_base_codewords))
-        base_tree = SaltedMerkle(zipped_codeword)
+        base_tree = SaltedMerkle(
+            list(zip(*all_base_codewords)), randomness)
         proof_stream.push(base_tree.root())
+        del all_base_codewords
 
         # get coefficients for table extensions
         challenges = self.sample_weights(
             11, proof_stream.prover_fiat_shamir())
 
-        initials = [self.xfield.sample(os.urandom(3*8))
-                    for i in range(len(self.permutation_arguments))]
+        initials = randomness.sample(
+            self.xfield, len(self.permutation_arguments), 3*8)
 
-        for table in self.tables:
-            table.extend(challenges, initials)
+        # one process pool serves the running products and evaluations of
+        # all tables
+        if num_workers == 1:
+            for table in self.tables:
+                table.extend(challenges, initials)
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                for table in self.tables:
+                    table.extend(challenges, initials, num_workers, executor)
 
         terminals = self.get_terminals()
 
         extension_codewords = reduce(
-            lambda x, y: x+y, [table.ldex(self.fri.domain, self.xfield) for table in self.tables], [])
+            lambda x, y: x+y, [table.ldex(self.fri.domain, self.xfield, randomness) for table in self.tables], [])
 
-        zipped_extension_codeword = list(zip(*extension_codewords))
-        extension_tree = SaltedMerkle(zipped_extension_codeword)
+        extension_tree = SaltedMerkle(
+            list(zip(*extension_codewords)), randomness)
         proof_stream.push(extension_tree.root())
 
-        extension_degree_bounds = reduce(lambda x, y: x+y, [[table.interpolant_degree()] * (
-            table.full_width - table.base_width) for table in self.tables], [])
-
-        quotient_codewords = []
-
-        for table in self.tables:
-            quotient_codewords += table.all_quotients(
-                self.fri.domain, table.codewords, challenges, terminals)
-
-        quotient_degree_bounds = []
-        for table in self.tables:
-            quotient_degree_bounds += table.all_quotient_degree_bounds(
-                challenges, terminals)
-
-        # ... and equal initial values
-        for pa in self.permutation_arguments:
-            quotient_codewords += [pa.quotient(self.fri.domain)]
-            quotient_degree_bounds += [pa.quotient_degree_bound()]
+        # every codeword is lifted to max_degree by the shift from the key
+        base_shifts = self.verifying_key.base_shifts
+        extension_shifts = self.verifying_key.extension_shifts
+        # quotients of all tables' constraints ... and equal initial values
+        quotient_shifts = self.verifying_key.quotient_shifts
 
         for t in terminals:
             proof_stream.push(t)
@@ -228,7 +393,7 @@ class BrainfuckStark:
         num_extension_polynomials = sum(
             table.full_width - table.base_width for table in self.tables)
         num_randomizer_polynomials = 1
-        num_quotient_polynomials = len(quotient_degree_bounds)
+        num_quotient_polynomials = len(quotient_shifts)
         weights_seed = proof_stream.prover_fiat_shamir()
         weights = self.sample_weights(
             num_randomizer_polynomials
@@ -237,68 +402,53 @@ class BrainfuckStark:
                    num_quotient_polynomials),
             weights_seed)
 
-        # compute terms of nonlinear combination polynomial
-        terms = [randomizer_codeword]
-        # base_codewords = processor_base_codewords + instruction_base_codewords + \
-        # memory_base_codewords + input_base_codewords + output_base_codewords
+        # compute nonlinear combination codeword
+        # combination = sum(weights[i] * terms[i] for i)
+        # Every term is folded into the combination as soon as it is
+        # available, so no list of (shifted) terms is ever materialized.
         assert (len(base_codewords) ==
                 num_base_polynomials), f"number of base codewords {len(base_codewords)} codewords =/= number of base polynomials {num_base_polynomials}!"
-        for i in range(len(base_codewords)):
-            terms += [[self.xfield.lift(c) for c in base_codewords[i]]]
-            shift = self.max_degree - base_degree_bounds[i]
-            terms += [[self.xfield.lift((self.fri.domain(j) ^ shift) * base_codewords[i][j])
-                      for j in range(self.fri.domain.length)]]
-            if os.environ.get('DEBUG') is not None:
-                print(f"before domain interpolation")
-                interpolated = self.fri.domain.xinterpolate(terms[-1])
-                print(
-                    f"degree of interpolation, base_codewords({i}): {interpolated.degree()}")
-                assert (interpolated.degree() <= self.max_degree)
         assert (len(extension_codewords) ==
                 num_extension_polynomials), f"number of extension codewords {len(extension_codewords)} =/= number of extension polynomials {num_extension_polynomials}"
-        for i in range(len(extension_codewords)):
-            terms += [extension_codewords[i]]
-            shift = self.max_degree - extension_degree_bounds[i]
-            terms += [[self.xfield.lift(self.fri.domain(j) ^ shift) * extension_codewords[i][j]
-                      for j in range(self.fri.domain.length)]]
-            if os.environ.get('DEBUG') is not None:
-                print(f"before domain interpolation")
-                interpolated = self.fri.domain.xinterpolate(terms[-1])
-                print(
-                    f"degree of interpolation, extension_codewords({i}): {interpolated.degree()}")
-                assert (interpolated.degree() <= self.max_degree)
-        assert (len(quotient_codewords) ==
-                num_quotient_polynomials), f"number of quotient codewords {len(quotient_codewords)} =/= number of quotient polynomials {num_quotient_polynomials}"
-
-        for quotient_codeword, quotient_degree_bound in zip(quotient_codewords, quotient_degree_bounds):
-            terms += [quotient_codeword]
-            if os.environ.get('DEBUG') is not None:
-                interpolated = self.fri.domain.xinterpolate(terms[-1])
-                assert (interpolated.degree() == -1 or interpolated.degree() <=
-                        quotient_degree_bound), f"for unshifted quotient polynomial {i}, interpolated degree is {interpolated.degree()} but > degree bound i = {quotient_degree_bound}"
-            shift = self.max_degree - quotient_degree_bound
-
-            terms += [[self.xfield.lift(self.fri.domain(j) ^ shift) * quotient_codeword[j]
-                      for j in range(self.fri.domain.length)]]
-            if os.environ.get('DEBUG') is not None:
-                print(f"before domain interpolation")
-                interpolated = self.fri.domain.xinterpolate(terms[-1])
-                print(
-                    f"degree of interpolation, , quotient_codewords({i}): {interpolated.degree()}")
-                print("quotient  degree bound:", quotient_degree_bound)
-                assert (interpolated.degree(
-                ) == -1 or interpolated.degree() <= self.max_degree), f"for (shifted) quotient polynomial {i}, interpolated degree is {interpolated.degree()} but > max_degree = {self.max_degree}"
-
-        # take weighted sum
-        # combination = sum(weights[i] * terms[i] for i)
-        assert (len(terms) == len(
-            weights)), f"number of terms {len(terms)} is not equal to number of weights {len(weights)}"
 
-        combination_codeword = reduce(
-            lambda lhs, rhs: [l+r for l, r in zip(lhs, rhs)], [[w * e for e in t] for w, t in zip(weights, terms)], [self.xfield.zero()] * self.fri.domain.length)
+        combination_codeword = [self.xfield.zero()] * self.fri.domain.length
+        self.accumulate(combination_codeword, weights[0], randomizer_codeword)
+        del randomizer_codeword, randomizer_codewords
+
+        weight_index = num_randomizer_polynomials
+        for codeword, shift in zip(base_codewords + extension_codewords, base_shifts + extension_shifts):
+            self.accumulate_shifted(
+                combination_codeword, weights[weight_index:weight_index+2], codeword, shift)
+            weight_index += 2
+        del base_codewords, extension_codewords
+
+        # sequentially, quotients are computed table by table and dropped
+        # once accumulated; zerofier inverses are shared between all tables
+        # and arguments
+        quotient_index = 0
+        for quotient_codeword in self.table_quotients(challenges, terminals, zerofiers, num_workers):
+            self.accumulate_shifted(combination_codeword, weights[weight_index:weight_index+2],
+                                    quotient_codeword, quotient_shifts[quotient_index])
+            weight_index += 2
+            quotient_index += 1
+
+        for pa in self.permutation_arguments:
+            self.accumulate_shifted(combination_codeword, weights[weight_index:weight_index+2],
+                                    pa.quotient(self.fri.domain, zerofiers), quotient_shifts[quotient_index])
+            weight_index += 2
+            quotient_index += 1
+
+        assert (quotient_index ==
+                num_quotient_polynomials), f"number of quotient codewords {quotient_index} =/= number of quotient polynomials {num_quotient_polynomials}"
+        assert (weight_index == len(
+            weights)), f"number of terms {weight_index} is not equal to number of weights {len(weights)}"
+
+        # the Merkle trees hold everything needed for openings
+        for table in self.tables:
+            table.codewords = []
 
         # commit to combination codeword
-        combination_tree = Merkle(combination_codeword)
+        combination_tree = Merkle(self.fri.leafs(combination_codeword))
         proof_stream.push(combination_tree.root())
 
         # get indices of leafs to prove nonlinear combination
@@ -311,26 +461,41 @@ class BrainfuckStark:
         unit_distances = list(set(unit_distances))
 
         # open leafs of zipped codewords at indicated positions
-        for index in indices:
-            for distance in [0] + unit_distances:
-                idx = (index + distance) % self.fri.domain.length
-                element = base_tree.leafs[idx][0]
-                salt, path = base_tree.open(idx)
-                proof_stream.push(element)
-                proof_stream.push((salt, path))
-
-                assert (SaltedMerkle.verify(base_tree.root(), idx, salt, path,
-                                            element)), "SaltedMerkle for base tree leaf fails to verify"
-
-                proof_stream.push(extension_tree.leafs[idx][0])
-                proof_stream.push(extension_tree.open(idx))
-
-        # open combination codeword at the same positions
-        for index in indices:
-            proof_stream.push(combination_tree.leafs[index])
-            proof_stream.push(combination_tree.open(index))
-            assert (Merkle.verify(combination_tree.root(), index,
-                                  combination_tree.open(index), combination_tree.leafs[index]))
+        if self.compress:
+            opened = sorted(set((index + distance) % self.fri.domain.length
+                                for index in indices for distance in [0] + unit_distances))
+            proof_stream.push([base_tree.leafs[idx][0] for idx in opened])
+            proof_stream.push(base_tree.open_many(opened))
+            proof_stream.push([extension_tree.leafs[idx][0]
+                              for idx in opened])
+            proof_stream.push(extension_tree.open_many(opened))
+            leaf_indices = [self.fri.leaf_index(
+                index, self.fri.domain.length) for index in indices]
+            proof_stream.push([combination_tree.leafs[i]
+                              for i in leaf_indices])
+            proof_stream.push(combination_tree.open_many(leaf_indices))
+        else:
+            for index in indices:
+                for distance in [0] + unit_distances:
+                    idx = (index + distance) % self.fri.domain.length
+                    element = base_tree.leafs[idx][0]
+                    salt, path = base_tree.open(idx)
+                    proof_stream.push(element)
+                    proof_stream.push((salt, path))
+
+                    assert (SaltedMerkle.verify(base_tree.root(), idx, salt, path,
+                                                element)), "SaltedMerkle for base tree leaf fails to verify"
+
+                    proof_stream.push(extension_tree.leafs[idx][0])
+                    proof_stream.push(extension_tree.open(idx))
+
+            # open combination codeword at the same positions
+            for index in indices:
+                i = self.fri.leaf_index(index, self.fri.domain.length)
+                proof_stream.push(combination_tree.leafs[i])
+                proof_stream.push(combination_tree.open(i))
+                assert (Merkle.verify(combination_tree.root(), i,
+                                      combination_tree.open(i), combination_tree.leafs[i]))
 
         # prove low degree of combination polynomial, and collect indices
         indices = self.fri.prove(combination_codeword, proof_stream)
@@ -372,15 +537,17 @@ class BrainfuckStark:
                      processor_output_evaluation_terminal,
                      instruction_evaluation_terminal]
 
-        base_degree_bounds = reduce(lambda x, y: x + y,
-                                    [[table.interpolant_degree(
-                                    )] * table.base_width for table in self.tables],
-                                    [])
+        base_shifts = self.verifying_key.base_shifts
+        extension_shifts = self.verifying_key.extension_shifts
+        quotient_shifts = self.verifying_key.quotient_shifts
 
-        extension_degree_bounds = reduce(lambda x, y: x+y,
-                                         [[table.interpolant_degree()] * (table.full_width - table.base_width)
-                                          for table in self.tables],
-                                         [])
+        # constraints depend on the challenges, so build them once per proof
+        boundary_constraints = [table.boundary_constraints_ext(
+            challenges) for table in self.tables]
+        transition_constraints = [table.transition_constraints_ext(
+            challenges) for table in self.tables]
+        terminal_constraints = [table.terminal_constraints_ext(
+            challenges, terminals) for table in self.tables]
 
         # get weights for nonlinear combination
         #  - 1 randomizer
@@ -391,18 +558,14 @@ class BrainfuckStark:
             table.full_width - table.base_width for table in self.tables)
         num_randomizer_polynomials = 1
 
-        num_quotient_polynomials = sum(table.num_quotients(
-            challenges, terminals) for table in self.tables)
-
-        num_difference_quotients = len(self.permutation_arguments)
+        num_quotient_polynomials = len(quotient_shifts)
 
         weights_seed = proof_stream.verifier_fiat_shamir()
         weights = self.sample_weights(
             num_randomizer_polynomials +
             2*num_base_polynomials +
             2*num_extension_polynomials +
-            2*num_quotient_polynomials +
-            2*num_difference_quotients,
+            2*num_quotient_polynomials,
             weights_seed)
 
         # pull Merkle root of combination codeword
@@ -419,28 +582,50 @@ class BrainfuckStark:
 
         # get leafs at indicated positions
         tuples = dict()
-        for index in indices:
-            for distance in [0] + unit_distances:
-                idx = (index + distance) % self.fri.domain.length
-
-                element = proof_stream.pull()
-                salt, path = proof_stream.pull()
-                verifier_verdict = verifier_verdict and SaltedMerkle.verify(
-                    base_root, idx, salt, path, element)
-                tuples[idx] = [self.xfield.lift(e) for e in list(element)]
-                assert (
-                    verifier_verdict), "salted base tree verify must succeed for base codewords"
-
-                element = proof_stream.pull()
-                salt, path = proof_stream.pull()
-                verifier_verdict = verifier_verdict and SaltedMerkle.verify(
-                    extension_root, idx, salt, path, element)
-                tuples[idx] = tuples[idx] + list(element)
-                assert (
-                    verifier_verdict), "salted base tree verify must succeed for extension codewords"
-
-        assert (num_base_polynomials == len(base_degree_bounds)
-                ), f"number of base polynomials {num_base_polynomials} =/= number of base degree bounds {len(base_degree_bounds)}"
+        if self.compress:
+            opened = sorted(set((index + distance) % self.fri.domain.length
+                                for index in indices for distance in [0] + unit_distances))
+            base_elements = proof_stream.pull()
+            salts, path = proof_stream.pull()
+            if not SaltedMerkle.verify_many(base_root, self.fri.domain.length, opened, salts, path, base_elements):
+                return False
+            extension_elements = proof_stream.pull()
+            salts, path = proof_stream.pull()
+            if not SaltedMerkle.verify_many(extension_root, self.fri.domain.length, opened, salts, path, extension_elements):
+                return False
+            for idx, base_element, extension_element in zip(opened, base_elements, extension_elements):
+                tuples[idx] = list(base_element) + list(extension_element)
+
+            combination_leafs = proof_stream.pull()
+            path = proof_stream.pull()
+            leaf_indices = [self.fri.leaf_index(
+                index, self.fri.domain.length) for index in indices]
+            if not Merkle.verify_many(combination_root, self.fri.num_leafs(self.fri.domain.length), leaf_indices, path, combination_leafs):
+                return False
+            combination_leafs = dict(zip(indices, combination_leafs))
+        else:
+            for index in indices:
+                for distance in [0] + unit_distances:
+                    idx = (index + distance) % self.fri.domain.length
+
+                    element = proof_stream.pull()
+                    salt, path = proof_stream.pull()
+                    verifier_verdict = verifier_verdict and SaltedMerkle.verify(
+                        base_root, idx, salt, path, element)
+                    tuples[idx] = list(element)
+                    assert (
+                        verifier_verdict), "salted base tree verify must succeed for base codewords"
+
+                    element = proof_stream.pull()
+                    salt, path = proof_stream.pull()
+                    verifier_verdict = verifier_verdict and SaltedMerkle.verify(
+                        extension_root, idx, salt, path, element)
+                    tuples[idx] = tuples[idx] + list(element)
+                    assert (
+                        verifier_verdict), "salted base tree verify must succeed for extension codewords"
+
+        assert (num_base_polynomials == len(base_shifts)
+                ), f"number of base polynomials {num_base_polynomials} =/= number of base shifts {len(base_shifts)}"
         # verify nonlinear combination
         for index in indices:
             # collect terms: randomizer
@@ -449,8 +634,7 @@ class BrainfuckStark:
             # collect terms: base
             for i in range(num_randomizer_polynomials, num_randomizer_polynomials+num_base_polynomials):
                 terms += [tuples[index][i]]
-                shift = self.max_degree - \
-                    base_degree_bounds[i-num_randomizer_polynomials]
+                shift = base_shifts[i-num_randomizer_polynomials]
                 terms += [tuples[index][i] *
                           self.xfield.lift(self.fri.domain(index) ^ shift)]
 
@@ -463,7 +647,7 @@ class BrainfuckStark:
 
             for i in range(num_extension_polynomials):
                 terms += [tuples[index][extension_offset+i]]
-                shift = self.max_degree - extension_degree_bounds[i]
+                shift = extension_shifts[i]
                 terms += [tuples[index][extension_offset+i]
                           * self.xfield.lift(self.fri.domain(index) ^ shift)]
 
@@ -489,14 +673,16 @@ class BrainfuckStark:
 
             base_acc_index = num_randomizer_polynomials
             ext_acc_index = extension_offset
-            for point, table in zip(points, self.tables):
+            quotient_index = 0
+            for point, table, table_boundary_constraints, table_transition_constraints, table_terminal_constraints in zip(points, self.tables, boundary_constraints, transition_constraints, terminal_constraints):
                 # boundary
-                for constraint, bound in zip(table.boundary_constraints_ext(challenges), table.boundary_quotient_degree_bounds(challenges)):
+                for constraint in table_boundary_constraints:
                     eval = constraint.evaluate(point)
                     quotient = eval / \
                         (self.xfield.lift(self.fri.domain(index)) - self.xfield.one())
                     terms += [quotient]
-                    shift = self.max_degree - bound
+                    shift = quotient_shifts[quotient_index]
+                    quotient_index += 1
                     terms += [quotient *
                               self.xfield.lift(self.fri.domain(index) ^ shift)]
 
@@ -510,7 +696,7 @@ class BrainfuckStark:
                     ext_acc_index+table.full_width-table.base_width)]
                 base_acc_index += table.base_width
                 ext_acc_index += table.full_width - table.base_width
-                for constraint, bound in zip(table.transition_constraints_ext(challenges), table.transition_quotient_degree_bounds(challenges)):
+                for constraint in table_transition_constraints:
                     eval = constraint.evaluate(
                         point + next_point)
                     # If height == 0, then there is no subgroup where the transition polynomials should be zero.
@@ -522,18 +708,20 @@ class BrainfuckStark:
                         quotient = eval * self.xfield.lift(self.fri.domain(index) - table.omicron.inverse()) / (
                             self.xfield.lift(self.fri.domain(index) ^ table.height) - self.xfield.one())
                     terms += [quotient]
-                    shift = self.max_degree - bound
+                    shift = quotient_shifts[quotient_index]
+                    quotient_index += 1
                     terms += [quotient *
                               self.xfield.lift(self.fri.domain(index) ^ shift)]
 
                 # terminal
-                for constraint, bound in zip(table.terminal_constraints_ext(challenges, terminals), table.terminal_quotient_degree_bounds(challenges, terminals)):
+                for constraint in table_terminal_constraints:
                     eval = constraint.evaluate(point)
                     quotient = eval / \
                         (self.xfield.lift(self.fri.domain(index)) -
                          self.xfield.lift(table.omicron.inverse()))
                     terms += [quotient]
-                    shift = self.max_degree - bound
+                    shift = quotient_shifts[quotient_index]
+                    quotient_index += 1
                     terms += [quotient *
                               self.xfield.lift(self.fri.domain(index) ^ shift)]
 
@@ -541,11 +729,13 @@ class BrainfuckStark:
                 quotient = arg.evaluate_difference(
                     points) / (self.xfield.lift(self.fri.domain(index)) - self.xfield.one())
                 terms += [quotient]
-                degree_bound = arg.quotient_degree_bound()
-                shift = self.max_degree - degree_bound
+                shift = quotient_shifts[quotient_index]
+                quotient_index += 1
                 terms += [quotient *
                           self.xfield.lift(self.fri.domain(index) ^ shift)]
 
+            assert (quotient_index ==
+                    num_quotient_polynomials), f"number of quotients {quotient_index} =/= number of quotient shifts {num_quotient_polynomials}"
             assert (len(terms) == len(
                 weights)), f"length of terms ({len(terms)}) must be equal to length of weights ({len(weights)})"
 
@@ -554,14 +744,19 @@ class BrainfuckStark:
                 lambda x, y: x + y, [w * t for w, t in zip(weights, terms)], self.xfield.zero())
 
             # get value of the combination codeword to test the inner product against
-            combination_leaf = proof_stream.pull()
-            combination_path = proof_stream.pull()
-
-            # verify Merkle authentication path
-            verifier_verdict = verifier_verdict and Merkle.verify(
-                combination_root, index, combination_path, combination_leaf)
-            if not verifier_verdict:
-                return False
+            if self.compress:
+                combination_leaf = combination_leafs[index]
+            else:
+                combination_leaf = proof_stream.pull()
+                combination_path = proof_stream.pull()
+
+                # verify Merkle authentication path
+                verifier_verdict = verifier_verdict and Merkle.verify(
+                    combination_root, self.fri.leaf_index(index, self.fri.domain.length), combination_path, combination_leaf)
+                if not verifier_verdict:
+                    return False
+            combination_leaf = self.fri.leaf_value(
+                combination_leaf, index, self.fri.domain.length)
 
             # check equality
             verifier_verdict = verifier_verdict and combination_leaf == inner_product
@@ -577,3 +772,12 @@ class BrainfuckStark:
                 terminals) == ea.compute_terminal(challenges)
 
         return verifier_verdict
+
+    def verify_batch(self, proofs, num_workers=None):
+        """Verify many proofs of this same claim in a pool of `num_workers`
+        processes (default: one per core). Every worker receives this
+        verifier object once, so the constraint setup and domain parameters
+        are shared by all proofs it handles. Returns one verdict per proof,
+        in order; proofs that fail to parse are rejected."""
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=initialize_batch_verifier, initargs=(self,)) as executor:
+            return list(executor.map(verify_in_batch, proofs))
@@ -1,16 +1,115 @@
+from algebra import *
+from univariate import Polynomial
+from extension_field import ExtensionFieldElement
+from functools import lru_cache
+from hashlib import blake2b
+from array import array
+
+
+def horner(values, iota, chunk_length=64):
+    """Running evaluation acc <- iota * acc + v over base field `values`,
+    starting from zero. Within a chunk of values, the products v * iota^j
+    are summed as plain integers on the three coefficients of iota^j and
+    reduced once; chunks are joined with one extension field multiplication
+    by iota^chunk_length each."""
+    xfield = iota.field
+    field = xfield.modulus.coefficients[0].field
+    extension_degree = xfield.modulus.degree()
+    powers = [xfield.one()]
+    for i in range(min(chunk_length, len(values))):
+        powers += [powers[-1] * iota]
+    limbs = [[c.value for c in power.polynomial.coefficients] + [0] * (extension_degree - len(power.polynomial.coefficients))
+             for power in powers]
+
+    acc = xfield.zero()
+    for start in range(0, len(values), chunk_length):
+        chunk = values[start:start+chunk_length]
+        sums = [0] * extension_degree
+        for j in range(len(chunk)):
+            v = chunk[j].value
+            power = limbs[len(chunk)-1-j]
+            for k in range(extension_degree):
+                sums[k] += v * power[k]
+        acc = acc * powers[len(chunk)] + ExtensionFieldElement(
+            Polynomial([BaseFieldElement(s % field.p, field) for s in sums]), xfield)
+    return acc
+
+
+def challenge_key(challenge):
+    return tuple(c.value for c in challenge.polynomial.coefficients)
+
+
+def challenge_from_key(key, xfield):
+    field = xfield.modulus.coefficients[0].field
+    return ExtensionFieldElement(Polynomial([BaseFieldElement(c, field) for c in key]), xfield)
+
+
+class Symbols:
+    """Integer values of a sequence of symbols, identified by a digest that
+    is computed once. Cached terminals are looked up by the digest, so a
+    lookup does not hash the whole sequence again."""
+
+    def __init__(self, elements):
+        self.values = tuple(e.value for e in elements)
+        self.digest = blake2b(array("Q", self.values).tobytes(),
+                              digest_size=16).digest()
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __eq__(self, other):
+        return type(other) == Symbols and self.digest == other.digest
+
+
+# terminals are cached by symbol digest and challenge coefficients, since
+# field elements are not hashable
+@lru_cache(maxsize=256)
+def cached_evaluation_terminal(symbols, iota, xfield):
+    field = xfield.modulus.coefficients[0].field
+    return horner([BaseFieldElement(v, field) for v in symbols.values], challenge_from_key(iota, xfield))
+
+
+@lru_cache(maxsize=256)
+def cached_program_terminal(program, challenges, xfield):
+    field = xfield.modulus.coefficients[0].field
+    a, b, c, eta = [challenge_from_key(key, xfield) for key in challenges]
+
+    # row i absorbs a * i + b * program[i] + c * program[i+1], and one last
+    # row past the end of the program has address len(program) and zero
+    # instructions
+    addresses = [BaseFieldElement(i, field) for i in range(len(program.values)+1)]
+    padded_program = [BaseFieldElement(p, field)
+                      for p in program.values] + [field.zero(), field.zero()]
+    return a * horner(addresses, eta) + b * horner(padded_program[:-1], eta) + c * horner(padded_program[1:], eta)
+
+
+def evaluation_terminal(symbols, iota):
+    """Terminal of the running evaluation of `symbols`, a list of base
+    field elements or `Symbols`."""
+    if type(symbols) != Symbols:
+        symbols = Symbols(symbols)
+    return cached_evaluation_terminal(symbols, challenge_key(iota), iota.field)
+
+
+def program_terminal(program, a, b, c, eta):
+    """Terminal of the instruction table's running evaluation over the
+    distinct rows of `program`, a list of base field elements or
+    `Symbols`."""
+    if type(program) != Symbols:
+        program = Symbols(program)
+    return cached_program_terminal(program, tuple(challenge_key(x) for x in [a, b, c, eta]), a.field)
+
+
 class EvaluationArgument:
     def __init__(self, challenge_index, terminal_index, symbols):
         self.challenge_index = challenge_index
         self.terminal_index = terminal_index
         self.symbols = symbols
+        self.key = Symbols(symbols)
 
     def compute_terminal(self, challenges):
         iota = challenges[self.challenge_index]
-        xfield = iota.field
-        acc = xfield.zero()
-        for s in self.symbols:
-            acc = iota * acc + xfield.lift(s)
-        return acc
+        return evaluation_terminal(self.key, iota)
 
     def select_terminal(self, terminals):
         return terminals[self.terminal_index]
@@ -21,33 +120,13 @@ class ProgramEvaluationArgument:
         self.challenge_indices = challenge_indices
         self.terminal_index = terminal_index
         self.program = program
+        self.key = Symbols(program)
 
     def compute_terminal(self, challenges):
         trimmed_challenges = [challenges[i] for i in range(
             len(challenges)) if i in self.challenge_indices]
         a, b, c, eta = trimmed_challenges
-        xfield = trimmed_challenges[0].field
-        running_sum = xfield.zero()
-        previous_address = -xfield.one()
-        padded_program = [xfield.lift(p)
-                          for p in self.program] + [xfield.zero()]
-        for i in range(len(padded_program)-1):
-            address = xfield(i)
-            current_instruction = padded_program[i]
-            next_instruction = padded_program[i+1]
-            if previous_address != address:
-                running_sum = running_sum * eta + a * address + \
-                    b * current_instruction + c * next_instruction
-            previous_address = address
-
-        index = len(padded_program)-1
-        address = xfield(index)
-        current_instruction = padded_program[index]
-        next_instruction = xfield.zero()
-        running_sum = running_sum * eta + a * address + \
-            b * current_instruction + c * next_instruction
-
-        return running_sum
+        return program_terminal(self.key, a, b, c, eta)
 
     def select_terminal(self, terminals):
         return terminals[self.terminal_index]
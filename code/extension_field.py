@@ -3,9 +3,12 @@ from algebra import *
 
 
 class ExtensionFieldElement:
+    # immutable, like base field elements
+    __slots__ = ("polynomial", "field")
+
     def __init__(self, polynomial, field):
-        self.polynomial = Polynomial(
-            polynomial.coefficients[:polynomial.degree()+1])
+        # polynomials are stored normalized already
+        self.polynomial = polynomial
         self.field = field
 
     def __add__(self, right):
@@ -20,6 +23,19 @@ class ExtensionFieldElement:
     def __truediv__(self, right):
         return self.field.divide(self, right)
 
+    # base field elements on the left
+    def __radd__(self, left):
+        return self.field.add(self, left)
+
+    def __rmul__(self, left):
+        return self.field.multiply(self, left)
+
+    def __rsub__(self, left):
+        return self.field.negate(self.field.subtract(self, left))
+
+    def __rtruediv__(self, left):
+        return self.field.multiply(self.field.inverse(self), left)
+
     def __neg__(self):
         return self.field.negate(self)
 
@@ -37,6 +53,8 @@ class ExtensionFieldElement:
         return acc
 
     def __eq__(self, other):
+        if type(other) == BaseFieldElement:
+            return self.polynomial == Polynomial([other])
         return self.polynomial == other.polynomial
 
     def __neq__(self, other):
@@ -55,20 +73,34 @@ class ExtensionFieldElement:
 class ExtensionField:
     def __init__(self, modulus):
         self.modulus = modulus
+        self.constants = [ExtensionFieldElement(Polynomial([]), self),
+                          ExtensionFieldElement(Polynomial([modulus.coefficients[0].field.one()]), self)]
+
+    def __reduce__(self):
+        return (ExtensionField, (self.modulus,))
 
     def zero(self):
-        return ExtensionFieldElement(Polynomial([]), self)
+        return self.constants[0]
 
     def one(self):
-        return ExtensionFieldElement(Polynomial([self.modulus.coefficients[0].field.one()]), self)
+        return self.constants[1]
 
+    # the right operand may also be a base field element, which is cheaper
+    # than lifting it: products scale the coefficients, and sums only touch
+    # the constant term
     def multiply(self, left, right):
+        if type(right) == BaseFieldElement:
+            return ExtensionFieldElement(Polynomial([c * right for c in left.polynomial.coefficients]), self)
         return ExtensionFieldElement((left.polynomial * right.polynomial) % self.modulus, self)
 
     def add(self, left, right):
+        if type(right) == BaseFieldElement:
+            return ExtensionFieldElement(left.polynomial + Polynomial([right]), self)
         return ExtensionFieldElement(left.polynomial + right.polynomial, self)
 
     def subtract(self, left, right):
+        if type(right) == BaseFieldElement:
+            return ExtensionFieldElement(left.polynomial - Polynomial([right]), self)
         return ExtensionFieldElement(left.polynomial - right.polynomial, self)
 
     def negate(self, operand):
@@ -82,6 +114,8 @@ class ExtensionField:
 
     def divide(self, left, right):
         assert(not right.is_zero()), "divide by zero"
+        if type(right) == BaseFieldElement:
+            return self.multiply(left, right.inverse())
         a, b, g = Polynomial.xgcd(right.polynomial, self.modulus)
         return ExtensionFieldElement(left.polynomial * a % self.modulus, self)
 
@@ -16,25 +16,110 @@ class Fri:
             self.offset = offset
             self.omega = omega
             self.length = length
+            self.points = PowerTable(omega, length, offset)
+            # lazily populated, see `powers` and `offset_powers`
+            self.power_tables = dict()
+            self.zerofiers = dict()
+            self.coset_scalars = []
 
         def __call__(self, index):
-            return (self.omega ^ index) * self.offset
+            return self.points(index)
 
         def list(self):
-            return [(self.omega ^ i) * self.offset for i in range(self.length)]
-
-        def evaluate(self, polynomial):
-            coefficients = polynomial.scale(self.offset).coefficients
-            coefficients += [self.omega.field.zero()] * \
-                (self.length - len(coefficients))
-            return ntt(self.omega, coefficients)
-
-        def xevaluate(self, polynomial, xfield=None):
+            # shared cache; do not modify the returned list
+            return self.powers(1)
+
+        def powers(self, exponent):
+            """Return the codeword `[x^exponent for x in domain]`.
+            The table is computed once per exponent, as the points
+            `offset^exponent * (omega^exponent)^i`, and cached on the
+            domain."""
+            if exponent not in self.power_tables:
+                if exponent == 1:
+                    table = self.points.list()
+                else:
+                    table = PowerTable(self.omega ^ exponent, self.length,
+                                       self.offset ^ exponent).list()
+                self.power_tables[exponent] = table
+            return self.power_tables[exponent]
+
+        def subgroup_zerofier(self, order):
+            """Return the codeword of `x^order - 1`, the zerofier of the
+            subgroup of the given order. Tables of equal height share it."""
+            if order not in self.zerofiers:
+                one = self.omega.field.one()
+                self.zerofiers[order] = [p - one for p in self.powers(order)]
+            return self.zerofiers[order]
+
+        def offset_powers(self, count):
+            # [offset^i for i in range(count)], shared cache
+            while len(self.coset_scalars) < count:
+                if len(self.coset_scalars) == 0:
+                    self.coset_scalars += [self.offset.field.one()]
+                else:
+                    self.coset_scalars += [self.coset_scalars[-1] * self.offset]
+            return self.coset_scalars[:count]
+
+        def coset_evaluate(self, coefficients, num_cosets=None, cosets=None):
+            """Evaluate the polynomial with the given base field coefficients
+            on the domain. The domain is the union of `num_cosets` cosets of
+            the subgroup generated by `omega^num_cosets`, interleaved, and
+            each coset costs one NTT of the subgroup's size. By default the
+            subgroup is the smallest one that fits the polynomial, so no
+            padding to the full domain length is needed. If `cosets` is
+            given, only the cosets with these indices are evaluated and the
+            other entries of the codeword are None."""
+            field = self.omega.field
+            if num_cosets == None:
+                size = 1
+                while size < len(coefficients):
+                    size *= 2
+                num_cosets = self.length // min(size, self.length)
+            size = self.length // num_cosets
+            assert(len(coefficients) <= size), f"cannot evaluate {len(coefficients)} coefficients on cosets of size {size}"
+
+            if cosets == None:
+                cosets = range(num_cosets)
+                codeword = [field.zero()] * self.length
+            else:
+                codeword = [None] * self.length
+
+            # coset k consists of the points offset * omega^(k + num_cosets*i)
+            scaled = [c * p for (c, p) in zip(coefficients,
+                                              self.offset_powers(len(coefficients)))]
+            root = self.omega ^ num_cosets
+            for k in cosets:
+                step = self.omega ^ k
+                factor = field.one()
+                values = []
+                for c in scaled:
+                    values += [c * factor]
+                    factor = factor * step
+                values += [field.zero()] * (size - len(values))
+                codeword[k::num_cosets] = ntt(root, values)
+            return codeword
+
+        def evaluate(self, polynomial, num_cosets=None, cosets=None):
+            return self.coset_evaluate(polynomial.coefficients, num_cosets, cosets)
+
+        def xevaluate(self, polynomial, xfield=None, num_cosets=None, cosets=None):
             if xfield == None:
                 assert(len(polynomial.coefficients) !=
                        0), "trying to xevaluate zero polynomial with no target field"
                 xfield = polynomial.coefficients[0].field
-            return fast_coset_evaluate(polynomial, xfield.lift(self.offset), xfield.lift(self.omega), self.length)
+
+            # evaluate the base field components of the coefficients separately
+            zero = self.omega.field.zero()
+            extension_degree = xfield.modulus.degree()
+            components = [[] for k in range(extension_degree)]
+            for coefficient in polynomial.coefficients:
+                limbs = xfield.lift(coefficient).polynomial.coefficients
+                for k in range(extension_degree):
+                    components[k] += [limbs[k] if k < len(limbs) else zero]
+            evaluations = [self.coset_evaluate(
+                component, num_cosets, cosets) for component in components]
+
+            return [None if limbs[0] is None else ExtensionFieldElement(Polynomial(list(limbs)), xfield) for limbs in zip(*evaluations)]
 
         def interpolate(self, values):
             return fast_coset_interpolate(self.offset, self.omega, values)
@@ -43,11 +128,18 @@ class Fri:
             xfield = values[0].field
             return fast_coset_interpolate(xfield.lift(self.offset), xfield.lift(self.omega), values)
 
-    def __init__(self, offset, omega, initial_domain_length, expansion_factor, num_colinearity_tests, xfield):
+    def __init__(self, offset, omega, initial_domain_length, expansion_factor, num_colinearity_tests, xfield, compress=False, grouped=False):
         self.domain = Fri.Domain(offset, omega, initial_domain_length)
         self.field = xfield
         self.expansion_factor = expansion_factor
         self.num_colinearity_tests = num_colinearity_tests
+        # compressed proofs open all leafs of a layer with one batched
+        # authentication path, and leave out the paths of c leafs, which
+        # reappear as a or b leafs in the next layer
+        self.compress = compress
+        # grouped leafs hold both elements that fold together, so that one
+        # authentication path per layer covers a colinearity test
+        self.grouped = grouped
 
         assert(self.num_rounds() >= 1), "cannot do FRI with less than one round"
 
@@ -86,13 +178,32 @@ class Fri:
         return indices
 
     def eval_domain(self):
-        return [self.domain(i) for i in range(self.domain.length)]
+        return [d for d in self.domain.list()]
+
+    def leafs(self, codeword):
+        # Merkle leafs committing to a codeword
+        if not self.grouped:
+            return codeword
+        half = len(codeword) // 2
+        return list(zip(codeword[:half], codeword[half:]))
+
+    def num_leafs(self, length):
+        return length // 2 if self.grouped else length
+
+    def leaf_index(self, index, length):
+        # index of the leaf holding codeword[index]
+        return index % (length // 2) if self.grouped else index
+
+    def leaf_value(self, leaf, index, length):
+        # codeword[index], from the leaf holding it
+        return leaf[index // (length // 2)] if self.grouped else leaf
 
     def commit(self, codeword, proof_stream, round_index=0):
         one = self.field.one()
         two = self.field.one() + self.field.one()
-        omega = self.field.lift(self.domain.omega)
-        offset = self.field.lift(self.domain.offset)
+        half = two.inverse()
+        omega = self.domain.omega
+        offset = self.domain.offset
         trees = []
         codewords = []
 
@@ -105,7 +216,7 @@ class Fri:
                    ), "error in commit: omega does not have the right order!"
 
             # compute and send Merkle root
-            tree = Merkle(codeword)
+            tree = Merkle(self.leafs(codeword))
             root = tree.root()
 
             # but don't send root in first round
@@ -123,9 +234,12 @@ class Fri:
             codewords += [codeword]
             trees += [tree]
 
-            # split and fold
-            codeword = [two.inverse() * ((one + alpha / (offset * (omega ^ i))) * codeword[i] + (
-                one - alpha / (offset * (omega ^ i))) * codeword[N//2 + i]) for i in range(N//2)]
+            # split and fold; the points x of this round's domain are only
+            # ever divided by, so tabulate their inverses directly
+            inverses = PowerTable(omega.inverse(), N//2,
+                                  offset.inverse()).list()
+            codeword = [half * ((one + alpha * inverses[i]) * codeword[i] + (
+                one - alpha * inverses[i]) * codeword[N//2 + i]) for i in range(N//2)]
 
             omega = omega ^ 2
             offset = offset ^ 2
@@ -138,40 +252,32 @@ class Fri:
 
         return codewords, trees
 
-    def query(self, current_tree, next_tree, c_indices, proof_stream):
-        # infer a and b indices
-        a_indices = [index for index in c_indices]
-        b_indices = [index + len(current_tree.leafs) //
-                     2 for index in c_indices]
-
-        # reveal leafs
-        for s in range(self.num_colinearity_tests):
-            proof_stream.push(
-                (current_tree.leafs[a_indices[s]], current_tree.leafs[b_indices[s]], next_tree.leafs[c_indices[s]]))
-
-        # reveal authentication paths
-        for s in range(self.num_colinearity_tests):
-            proof_stream.push(current_tree.open(a_indices[s]))
-            proof_stream.push(current_tree.open(b_indices[s]))
-            proof_stream.push(next_tree.open(c_indices[s]))
-
-        return a_indices + b_indices
-
-    def query_last(self, current_tree, last_codeword, c_indices, proof_stream):
+    def query(self, current_codeword, current_tree, next_codeword, next_tree, c_indices, proof_stream):
         # infer a and b indices
         a_indices = [index for index in c_indices]
-        b_indices = [index + len(current_tree.leafs) //
+        b_indices = [index + len(current_codeword) //
                      2 for index in c_indices]
 
         # reveal leafs
         for s in range(self.num_colinearity_tests):
             proof_stream.push(
-                (current_tree.leafs[a_indices[s]], current_tree.leafs[b_indices[s]], last_codeword[c_indices[s]]))
-
-        # reveal authentication paths
-        for s in range(self.num_colinearity_tests):
-            proof_stream.push(current_tree.open(a_indices[s]))
-            proof_stream.push(current_tree.open(b_indices[s]))
+                (current_codeword[a_indices[s]], current_codeword[b_indices[s]], next_codeword[c_indices[s]]))
+
+        # reveal authentication paths; with compressed proofs or grouped
+        # leafs, c leafs are authenticated by the next layer instead
+        if self.compress:
+            leaf_indices = [self.leaf_index(index, len(current_codeword))
+                            for index in a_indices + b_indices]
+            proof_stream.push(current_tree.open_many(leaf_indices))
+        elif self.grouped:
+            for s in range(self.num_colinearity_tests):
+                proof_stream.push(current_tree.open(a_indices[s]))
+        else:
+            for s in range(self.num_colinearity_tests):
+                proof_stream.push(current_tree.open(a_indices[s]))
+                proof_stream.push(current_tree.open(b_indices[s]))
+                if next_tree != None:
+                    proof_stream.push(next_tree.open(c_indices[s]))
 
         return a_indices + b_indices
 
@@ -187,14 +293,14 @@ class Fri:
             codewords[1]), len(codewords[-1]), self.num_colinearity_tests)
         indices = [index for index in top_level_indices]
 
-        # query phase
-        for i in range(len(trees)-1):
+        # query phase; the last codeword is sent in the clear, so there is
+        # no tree to open it in
+        for i in range(len(trees)):
             indices = [index % (len(codewords[i])//2)
                        for index in indices]  # fold
-            self.query(trees[i], trees[i+1], indices, proof_stream)
-        indices = [index % (len(codewords[-1]))
-                   for index in indices]  # fold for last codeword
-        self.query_last(trees[-1], codewords[-1], indices, proof_stream)
+            next_tree = trees[i+1] if i+1 < len(trees) else None
+            self.query(codewords[i], trees[i], codewords[i+1],
+                       next_tree, indices, proof_stream)
 
         return top_level_indices
 
@@ -216,25 +322,22 @@ class Fri:
         # check if it matches the given root
         # how?! We don't have the salts!
         # We don't need the salts if we use *unsalted* merkle trees :-)
-        if roots[-1] != Merkle(last_codeword).root():
+        if roots[-1] != Merkle(self.leafs(last_codeword)).root():
             print("last codeword is not well formed")
             return False
 
         # check if it is low degree
         degree = (len(last_codeword) // self.expansion_factor) - 1
-        last_omega = omega
-        last_offset = offset
-        for r in range(self.num_rounds()-1):
-            last_omega = last_omega ^ 2
-            last_offset = last_offset ^ 2
+        last_omega = self.domain.omega ^ (1 << (self.num_rounds()-1))
+        last_offset = self.domain.offset ^ (1 << (self.num_rounds()-1))
 
         # assert that last_omega has the right order
         assert(last_omega.inverse() == last_omega ^ (
             len(last_codeword)-1)), "omega does not have right order"
 
         # compute interpolant
-        last_domain = [last_offset * (last_omega ^ i)
-                       for i in range(len(last_codeword))]
+        last_domain = [self.field.lift(x) for x in PowerTable(
+            last_omega, len(last_codeword), last_offset).list()]
         poly = Polynomial.interpolate_domain(last_domain, last_codeword)
         #coefficients = intt(last_omega, last_codeword)
         #poly = Polynomial(coefficients).scale(last_offset.inverse())
@@ -256,6 +359,7 @@ class Fri:
         ), self.domain.length >> 1, self.domain.length >> (self.num_rounds()-1), self.num_colinearity_tests)
 
         # for every pair of consecutive rounds, check consistency of subsequent layers
+        previous_c_leafs = []
         for r in range(self.num_rounds()-1):
 
             # fold c indices
@@ -286,20 +390,49 @@ class Fri:
                     return False
 
             # verify authentication paths
-            for i in range(self.num_colinearity_tests):
+            length = self.domain.length >> r
+            if self.grouped:
+                leaf_indices = a_indices
+                leafs = list(zip(aa, bb))
+            else:
+                leaf_indices = a_indices + b_indices
+                leafs = aa + bb
+            if self.compress:
                 path = proof_stream.pull()
-                if Merkle.verify(roots[r], a_indices[i], path, aa[i]) == False:
-                    print("merkle authentication path verification fails for aa")
+                if Merkle.verify_many(roots[r], self.num_leafs(length), leaf_indices, path, leafs) == False:
+                    print("merkle authentication path verification fails for aa and bb")
                     return False
-                path = proof_stream.pull()
-                if Merkle.verify(roots[r], b_indices[i], path, bb[i]) == False:
-                    print("merkle authentication path verification fails for bb")
-                    return False
-                if r+1 != self.num_rounds()-1:
+            elif self.grouped:
+                for i in range(self.num_colinearity_tests):
                     path = proof_stream.pull()
-                    if Merkle.verify(roots[r+1], c_indices[i], path, cc[i]) == False:
-                        print("merkle authentication path verification fails for cc")
+                    if Merkle.verify(roots[r], leaf_indices[i], path, leafs[i]) == False:
+                        print("merkle authentication path verification fails for aa and bb")
+                        return False
+            else:
+                for i in range(self.num_colinearity_tests):
+                    path = proof_stream.pull()
+                    if Merkle.verify(roots[r], a_indices[i], path, aa[i]) == False:
+                        print("merkle authentication path verification fails for aa")
+                        return False
+                    path = proof_stream.pull()
+                    if Merkle.verify(roots[r], b_indices[i], path, bb[i]) == False:
+                        print("merkle authentication path verification fails for bb")
+                        return False
+                    if r+1 != self.num_rounds()-1:
+                        path = proof_stream.pull()
+                        if Merkle.verify(roots[r+1], c_indices[i], path, cc[i]) == False:
+                            print("merkle authentication path verification fails for cc")
+                            return False
+
+            # without c paths, the c leafs of the previous round must
+            # reappear as a or b leafs here
+            if self.compress or self.grouped:
+                opened = dict(zip(a_indices + b_indices, aa + bb))
+                for index, value in previous_c_leafs:
+                    if index not in opened or opened[index] != value:
+                        print("leafs in previous round do not correspond to this round")
                         return False
+                previous_c_leafs = list(zip(c_indices, cc))
 
             # if we are in the last round, we did not check the Merkle paths
             # but we did get the last codeword, so we should check the "leafs"
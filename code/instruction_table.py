@@ -1,5 +1,6 @@
 from processor_table import ProcessorTable
 from table import *
+from scan import affine_scan
 
 
 class InstructionTable(Table):
@@ -27,7 +28,7 @@ class InstructionTable(Table):
     @staticmethod
     def transition_constraints_afo_named_variables(address, current_instruction, next_instruction, address_next, current_instruction_next, next_instruction_next):
         field = list(address.dictionary.values())[0].field
-        one = MPolynomial.constant(field.one())
+        one = MExpression.constant(field.one())
 
         polynomials = []
         # instruction pointer increases by 0 or 1
@@ -43,14 +44,14 @@ class InstructionTable(Table):
         return polynomials
 
     def base_transition_constraints(self):
-        address, current_instruction, next_instruction, address_next, current_instruction_next, next_instruction_next = MPolynomial.variables(
+        address, current_instruction, next_instruction, address_next, current_instruction_next, next_instruction_next = MExpression.variables(
             6, self.field)
         return InstructionTable.transition_constraints_afo_named_variables(address, current_instruction, next_instruction, address_next, current_instruction_next, next_instruction_next)
 
     def base_boundary_constraints(self):
         # format: mpolynomial
-        x = MPolynomial.variables(self.base_width, self.field)
-        zero = MPolynomial.zero()
+        x = MExpression.variables(self.base_width, self.field)
+        zero = MExpression.zero()
         return [x[InstructionTable.address]-zero]
 
       #
@@ -60,20 +61,20 @@ class InstructionTable(Table):
     @staticmethod
     def instruction_zerofier(current_instruction):
         field = list(current_instruction.dictionary.values())[0].field
-        acc = MPolynomial.constant(field.one())
+        acc = MExpression.constant(field.one())
         for ch in ['[', ']', '<', '>', '+', '-', ',', '.']:
-            ch_ = MPolynomial.constant(field(ord(ch)))
+            ch_ = MExpression.constant(field(ord(ch)))
             acc *= current_instruction - ch_
         return acc
 
     def transition_constraints_ext(self, challenges):
         field = challenges[0].field
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = [
-            MPolynomial.constant(ch) for ch in challenges]
+            MExpression.constant(ch) for ch in challenges]
         address, current_instruction, next_instruction, permutation, evaluation, \
-            address_next, current_instruction_next, next_instruction_next, permutation_next, evaluation_next = MPolynomial.variables(
+            address_next, current_instruction_next, next_instruction_next, permutation_next, evaluation_next = MExpression.variables(
                 2*self.full_width, field)
-        one = MPolynomial.constant(field.one())
+        one = MExpression.constant(field.one())
 
         polynomials = InstructionTable.transition_constraints_afo_named_variables(
             address, current_instruction, next_instruction, address_next, current_instruction_next, next_instruction_next)
@@ -93,7 +94,7 @@ class InstructionTable(Table):
 
         ifnewaddress = address_next - address
         ifoldaddress = address_next - address - \
-            MPolynomial.constant(field.one())
+            MExpression.constant(field.one())
 
         polynomials += [ifnewaddress *
                         (
@@ -113,11 +114,11 @@ class InstructionTable(Table):
     def boundary_constraints_ext(self, challenges):
         field = challenges[0].field
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = [
-            MPolynomial.constant(ch) for ch in challenges]
+            MExpression.constant(ch) for ch in challenges]
         # format: (cycle, polynomial)
-        x = MPolynomial.variables(self.full_width, field)
-        one = MPolynomial.constant(self.field.one())
-        zero = MPolynomial.zero()
+        x = MExpression.variables(self.full_width, field)
+        one = MExpression.constant(self.field.one())
+        zero = MExpression.zero()
         return [x[InstructionTable.address] - zero,  # address starts at zero
                 # x[self.permutation] - one,  # running product starts at 1
                 x[InstructionTable.evaluation] -
@@ -127,12 +128,12 @@ class InstructionTable(Table):
 
     def terminal_constraints_ext(self, challenges, terminals):
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = [
-            MPolynomial.constant(ch) for ch in challenges]
+            MExpression.constant(ch) for ch in challenges]
         processor_instruction_permutation_terminal, processor_memory_permutation_terminal, processor_input_evaluation_terminal, processor_output_evaluation_terminal, instruction_evaluation_terminal = [
-            MPolynomial.constant(t) for t in terminals]
+            MExpression.constant(t) for t in terminals]
         field = challenges[0].field
-        x = MPolynomial.variables(self.full_width, field)
-        zero = MPolynomial.zero()
+        x = MExpression.variables(self.full_width, field)
+        zero = MExpression.zero()
 
         constraints = []
 
@@ -168,64 +169,42 @@ class InstructionTable(Table):
 
         return constraints
 
-    def extend(self, all_challenges, all_initials):
+    def extend(self, all_challenges, all_initials, num_workers=1, executor=None):
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = all_challenges
         processor_instruction_permutation_initial, processor_memory_permutation_initial = all_initials
         # algebra stuff
-        field = self.field
         xfield = a.field
-        one = xfield.one()
         zero = xfield.zero()
 
-        # prepare loop
-        extended_matrix = []
-        permutation_running_product = processor_instruction_permutation_initial
-        evaluation_running_sum = zero
-        previous_address = -one
-
-        # loop over all rows of table
-        num_padded_rows = 0
-        for i in range(len(self.matrix)):
-            row = self.matrix[i]
-            new_row = []
-
-            # first, copy over existing row
-            new_row = [xfield.lift(nr) for nr in row]
+        address, current_instruction, next_instruction = [[row[j] for row in self.matrix] for j in [
+            InstructionTable.address, InstructionTable.current_instruction, InstructionTable.next_instruction]]
 
-            if new_row[InstructionTable.current_instruction].is_zero():
-                num_padded_rows += 1
+        # permutation argument: update the running product unless the row
+        # is padding or the instruction address just changed
+        permutation_factors = [alpha - a * address[i] - b * current_instruction[i] - c * next_instruction[i]
+                               if not current_instruction[i].is_zero() and i > 0 and address[i] == address[i-1] else None
+                               for i in range(len(self.matrix))]
 
-            # permutation argument
-            # update running product?
-            # make sure the new row is not padding
-            if not new_row[InstructionTable.current_instruction].is_zero():
-                # and that the instruction address didn't just change
-                if i > 0 and new_row[InstructionTable.address] == xfield.lift(self.matrix[i-1][InstructionTable.address]):
-                    permutation_running_product *= alpha - \
-                        a * new_row[InstructionTable.address] - \
-                        b * new_row[InstructionTable.current_instruction] - \
-                        c * new_row[InstructionTable.next_instruction]
-                # print("%i:" % i, permutation_running_product)
+        # evaluation argument: absorb every new address once
+        evaluation_multipliers = [eta if i == 0 or address[i] != address[i-1] else None
+                                  for i in range(len(self.matrix))]
+        evaluation_addends = [a * address[i] + b * current_instruction[i] + c * next_instruction[i]
+                              if evaluation_multipliers[i] is not None else None for i in range(len(self.matrix))]
 
-            new_row += [permutation_running_product]
+        # both columns hold the accumulators after their row is applied
+        permutation = affine_scan(
+            processor_instruction_permutation_initial, permutation_factors, num_workers=num_workers, executor=executor)
+        evaluation = affine_scan(
+            zero, evaluation_multipliers, evaluation_addends, num_workers, executor)
 
-            # evaluation argument
-            if new_row[InstructionTable.address] != previous_address:
-                evaluation_running_sum = eta * evaluation_running_sum + \
-                    a * new_row[InstructionTable.address] + \
-                    b * new_row[InstructionTable.current_instruction] + \
-                    c * new_row[InstructionTable.next_instruction]
-            new_row += [evaluation_running_sum]
-
-            previous_address = new_row[InstructionTable.address]
-
-            extended_matrix += [new_row]
+        extended_matrix = []
+        for i in range(len(self.matrix)):
+            extended_matrix += [self.matrix[i] +
+                                [permutation[i+1], evaluation[i+1]]]
 
         self.field = xfield
         self.matrix = extended_matrix
-        self.codewords = [[xfield.lift(c) for c in cdwd]
-                          for cdwd in self.codewords]
 
-        self.permutation_terminal = permutation_running_product
-        self.evaluation_terminal = evaluation_running_sum
+        self.permutation_terminal = permutation[-1]
+        self.evaluation_terminal = evaluation[-1]
 
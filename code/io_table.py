@@ -1,4 +1,5 @@
 from table import *
+from scan import affine_scan
 
 
 class IOTable(Table):
@@ -32,9 +33,9 @@ class IOTable(Table):
     def transition_constraints_ext(self, challenges):
         field = challenges[0].field
         input_, evaluation, \
-            input_next, evaluation_next = MPolynomial.variables(
+            input_next, evaluation_next = MExpression.variables(
                 2*self.full_width, field)
-        iota = MPolynomial.constant(challenges[self.challenge_index])
+        iota = MExpression.constant(challenges[self.challenge_index])
 
         polynomials = []
 
@@ -45,8 +46,8 @@ class IOTable(Table):
     def boundary_constraints_ext(self, challenges):
         field = challenges[0].field
         # format: mpolynomial
-        x = MPolynomial.variables(self.full_width, field)
-        zero = MPolynomial.zero()
+        x = MExpression.variables(self.full_width, field)
+        zero = MExpression.zero()
         return [x[IOTable.evaluation] - x[IOTable.column]]  # evaluation
 
     def terminal_constraints_ext(self, challenges, terminals):
@@ -57,12 +58,12 @@ class IOTable(Table):
 
         field = challenges[0].field
         iota = challenges[self.challenge_index]
-        offset = MPolynomial.constant(
+        offset = MExpression.constant(
             iota ^ (self.height - self.length))
 
-        evaluation_terminal = MPolynomial.constant(
+        evaluation_terminal = MExpression.constant(
             terminals[self.terminal_index])
-        x = MPolynomial.variables(self.full_width, field)
+        x = MExpression.variables(self.full_width, field)
 
         # In every additional row, the running evaluation variable is
         # multiplied by another factor iota. So we multiply by iota^diff
@@ -73,39 +74,27 @@ class IOTable(Table):
 
         return [x[IOTable.evaluation] - actual_terminal]
 
-    def extend_iotable(self, iota):
+    def extend_iotable(self, iota, num_workers=1, executor=None):
 
         # algebra stuff
         xfield = iota.field
         zero = xfield.zero()
 
-        # prepare loop
-        extended_matrix = []
-        io_running_evaluation = zero
-        evaluation_terminal = zero
+        # running evaluation, including the current row
+        symbols = [row[IOTable.column] for row in self.matrix]
+        evaluation = affine_scan(
+            zero, [iota] * len(symbols), symbols, num_workers, executor)
 
-        # loop over all rows of table
+        extended_matrix = []
         for i in range(len(self.matrix)):
-            row = self.matrix[i]
-            new_row = [xfield.lift(nr) for nr in row]
-
-            io_running_evaluation = io_running_evaluation * \
-                iota + new_row[IOTable.column]
-            new_row += [io_running_evaluation]
-
-            if i == self.length - 1:
-                evaluation_terminal = io_running_evaluation
-
-            extended_matrix += [new_row]
+            extended_matrix += [self.matrix[i] + [evaluation[i+1]]]
 
         assert(self.height & (self.height - 1)
                == 0), f"height of io_table must be 2^k"
 
         self.field = xfield
         self.matrix = extended_matrix
-        self.codewords = [[xfield.lift(c) for c in cdwd]
-                          for cdwd in self.codewords]
-        self.evaluation_terminal = evaluation_terminal
+        self.evaluation_terminal = evaluation[self.length]
 
 
 class InputTable(IOTable):
@@ -114,8 +103,9 @@ class InputTable(IOTable):
         self.challenge_index = 8
         self.terminal_index = 2
 
-    def extend(self, all_challenges, all_initials):
-        self.extend_iotable(all_challenges[self.challenge_index])
+    def extend(self, all_challenges, all_initials, num_workers=1, executor=None):
+        self.extend_iotable(
+            all_challenges[self.challenge_index], num_workers, executor)
 
 
 class OutputTable(IOTable):
@@ -124,5 +114,6 @@ class OutputTable(IOTable):
         self.challenge_index = 9
         self.terminal_index = 3
 
-    def extend(self, all_challenges, all_initials):
-        self.extend_iotable(all_challenges[self.challenge_index])
+    def extend(self, all_challenges, all_initials, num_workers=1, executor=None):
+        self.extend_iotable(
+            all_challenges[self.challenge_index], num_workers, executor)
@@ -1,4 +1,5 @@
 from table import *
+from scan import affine_scan
 from processor_table import ProcessorTable
 
 
@@ -46,7 +47,7 @@ class MemoryTable(Table):
     @staticmethod
     def transition_constraints_afo_named_variables(cycle, address, value, dummy, cycle_next, address_next, value_next, dummy_next):
         field = list(address.dictionary.values())[0].field
-        one = MPolynomial.constant(field.one())
+        one = MExpression.constant(field.one())
 
         polynomials = []
 
@@ -94,15 +95,15 @@ class MemoryTable(Table):
 
     def base_transition_constraints(self):
         cycle, address, value, dummy, \
-            cycle_next, address_next, value_next, dummy_next = MPolynomial.variables(
+            cycle_next, address_next, value_next, dummy_next = MExpression.variables(
                 2*self.base_width, self.field)
         return MemoryTable.transition_constraints_afo_named_variables(cycle, address, value, dummy, cycle_next, address_next, value_next, dummy_next)
 
     def base_boundary_constraints(self):
         # format: mpolynomial
-        x = MPolynomial.variables(self.base_width, self.field)
-        one = MPolynomial.constant(self.field.one())
-        zero = MPolynomial.zero()
+        x = MExpression.variables(self.base_width, self.field)
+        one = MExpression.constant(self.field.one())
+        zero = MExpression.zero()
         return [x[MemoryTable.cycle],
                 x[MemoryTable.memory_pointer],
                 x[MemoryTable.memory_value],
@@ -114,11 +115,11 @@ class MemoryTable(Table):
 
     def transition_constraints_ext(self, challenges):
         field = challenges[0].field
-        one = MPolynomial.constant(field.one())
+        one = MExpression.constant(field.one())
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = [
-            MPolynomial.constant(c) for c in challenges]
+            MExpression.constant(c) for c in challenges]
         cycle, address, value, dummy, permutation,  \
-            cycle_next, address_next, value_next, dummy_next, permutation_next = MPolynomial.variables(
+            cycle_next, address_next, value_next, dummy_next, permutation_next = MExpression.variables(
                 2*self.full_width, field)
 
         polynomials = MemoryTable.transition_constraints_afo_named_variables(
@@ -135,9 +136,9 @@ class MemoryTable(Table):
     def boundary_constraints_ext(self, challenges):
         field = challenges[0].field
         # format: mpolynomial
-        x = MPolynomial.variables(self.full_width, field)
-        one = MPolynomial.constant(field.one())
-        zero = MPolynomial.zero()
+        x = MExpression.variables(self.full_width, field)
+        one = MExpression.constant(field.one())
+        zero = MExpression.zero()
         return [x[MemoryTable.cycle] - zero,  # cycle
                 x[MemoryTable.memory_pointer] - zero,  # memory pointer
                 x[MemoryTable.memory_value] - zero,  # memory value
@@ -146,11 +147,11 @@ class MemoryTable(Table):
 
     def terminal_constraints_ext(self, challenges, terminals):
         field = challenges[0].field
-        one = MPolynomial.constant(field.one())
+        one = MExpression.constant(field.one())
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = [
-            MPolynomial.constant(ch) for ch in challenges]
+            MExpression.constant(ch) for ch in challenges]
         permutation = terminals[1]
-        x = MPolynomial.variables(self.full_width, field)
+        x = MExpression.variables(self.full_width, field)
 
         # [permutation *
         #                 (beta - d * cycle
@@ -168,39 +169,27 @@ class MemoryTable(Table):
                  (beta - d * x[MemoryTable.cycle]
                   - e * x[MemoryTable.memory_pointer]
                   - f * x[MemoryTable.memory_value])
-                 - MPolynomial.constant(permutation)) * (one - x[MemoryTable.dummy])
-                + (x[MemoryTable.permutation] - MPolynomial.constant(permutation)) * x[MemoryTable.dummy]]
+                 - MExpression.constant(permutation)) * (one - x[MemoryTable.dummy])
+                + (x[MemoryTable.permutation] - MExpression.constant(permutation)) * x[MemoryTable.dummy]]
 
-    def extend(self, all_challenges, all_initials):
+    def extend(self, all_challenges, all_initials, num_workers=1, executor=None):
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = all_challenges
         processor_instruction_permutation_initial, processor_memory_permutation_initial = all_initials
 
         # algebra stuff
-        field = self.field
         xfield = d.field
-        one = xfield.one()
 
-        # prepare loop
-        extended_matrix = []
-        memory_permutation_running_product = processor_memory_permutation_initial
+        # dummy rows leave the running product as is
+        factors = [beta - d * row[MemoryTable.cycle] - e * row[MemoryTable.memory_pointer] - f * row[MemoryTable.memory_value]
+                   if row[MemoryTable.dummy].is_zero() else None for row in self.matrix]
+        permutation = affine_scan(
+            processor_memory_permutation_initial, factors, num_workers=num_workers, executor=executor)
 
-        # loop over all rows of table
+        # every row holds the running product before it is applied
+        extended_matrix = []
         for i in range(len(self.matrix)):
-            row = self.matrix[i]
-            new_row = [xfield.lift(nr) for nr in row]
-
-            new_row += [memory_permutation_running_product]
-
-            extended_matrix += [new_row]
-
-            if new_row[MemoryTable.dummy].is_zero():
-                memory_permutation_running_product *= beta \
-                    - d * new_row[MemoryTable.cycle] \
-                    - e * new_row[MemoryTable.memory_pointer] \
-                    - f * new_row[MemoryTable.memory_value]
+            extended_matrix += [self.matrix[i] + [permutation[i]]]
 
         self.matrix = extended_matrix
         self.field = xfield
-        self.codewords = [[xfield.lift(c) for c in cdwd]
-                          for cdwd in self.codewords]
-        self.permutation_terminal = memory_permutation_running_product
+        self.permutation_terminal = permutation[-1]
@@ -61,3 +61,61 @@ class Merkle:
                 running_hash = blake2b(node + running_hash).digest()
             index >>= 1
         return running_hash == root
+
+    def open_many(self, indices):
+        """Authentication paths for all `indices` at once. Nodes that the
+        verifier can compute from the opened leafs or from other nodes in
+        the batch are left out."""
+        return Merkle.multi_path(self.nodes, self.depth, indices)
+
+    @staticmethod
+    def verify_many(root, num_leafs, indices, path, elements):
+        leaf_hashes = [blake2b(pickle.dumps(element)).digest()
+                       for element in elements]
+        if len(leaf_hashes) != len(indices):
+            return False
+        return Merkle.verify_multi_path(root, num_leafs, indices, path, leaf_hashes)
+
+    @staticmethod
+    def multi_path(nodes, depth, indices):
+        # walk up the tree layer by layer, in order of node index, and keep
+        # only the siblings that are not themselves known
+        layer = sorted(set((1 << depth) | index for index in indices))
+        path = []
+        for level in range(depth):
+            members = set(layer)
+            for node in layer:
+                if node ^ 1 not in members:
+                    path += [nodes[node ^ 1]]
+            layer = sorted(set(node >> 1 for node in layer))
+        return path
+
+    @staticmethod
+    def verify_multi_path(root, num_leafs, indices, path, leaf_hashes):
+        depth = (num_leafs - 1).bit_length()
+        layer = dict()
+        for index, leaf_hash in zip(indices, leaf_hashes):
+            node = (1 << depth) | index
+            if node in layer and layer[node] != leaf_hash:
+                return False
+            layer[node] = leaf_hash
+
+        position = 0
+        for level in range(depth):
+            parents = dict()
+            for node in sorted(layer.keys()):
+                if node >> 1 in parents:
+                    continue
+                if node ^ 1 in layer:
+                    sibling = layer[node ^ 1]
+                elif position < len(path):
+                    sibling = path[position]
+                    position += 1
+                else:
+                    return False
+                if node % 2 == 0:
+                    parents[node >> 1] = blake2b(layer[node] + sibling).digest()
+                else:
+                    parents[node >> 1] = blake2b(sibling + layer[node]).digest()
+            layer = parents
+        return position == len(path) and layer.get(1) == root
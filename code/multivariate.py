@@ -2,7 +2,10 @@ from univariate import *
 
 
 class MPolynomial:
-    def __init__(self, dictionary):
+    # bits per exponent in a packed monomial
+    exponent_bits = 32
+
+    def __init__(self, dictionary, num_variables=None):
         # Multivariate polynomials are represented as dictionaries with exponent vectors
         # as keys and coefficients as values. E.g.:
         # f(x,y,z) = 17 + 2xy + 42z - 19x^6*y^3*z^12 is represented as:
@@ -12,82 +15,93 @@ class MPolynomial:
         #     (0,0,1) => 42,
         #     (6,3,12) => -19,
         # }
-        self.dictionary = dictionary
+        # Internally, every exponent vector is packed into one int with
+        # `exponent_bits` bits per variable (see `pack`), so keys need no
+        # padding and multiplying monomials is adding ints. The tuple-keyed
+        # dictionary is rebuilt on demand and must not be modified.
+        if num_variables == None:
+            self.terms = {MPolynomial.pack(k): v for k, v in dictionary.items()}
+            self.num_variables = max([0] + [len(k) for k in dictionary.keys()])
+        else:
+            self.terms = dictionary
+            self.num_variables = num_variables
+        self.tuples = None
+        self.plan = None
+
+    def pack(exponents):
+        packed = 0
+        for i in range(len(exponents)):
+            packed |= exponents[i] << (MPolynomial.exponent_bits * i)
+        return packed
+
+    def unpack(packed, num_variables):
+        mask = (1 << MPolynomial.exponent_bits) - 1
+        return tuple((packed >> (MPolynomial.exponent_bits * i)) & mask for i in range(num_variables))
+
+    @property
+    def dictionary(self):
+        if self.tuples == None:
+            self.tuples = {MPolynomial.unpack(k, self.num_variables): v
+                           for k, v in self.terms.items()}
+        return self.tuples
 
     def zero():
-        return MPolynomial(dict())
+        return MPolynomial(dict(), 0)
 
     def __add__(self, other):
-        dictionary = dict()
-        num_variables = max([0] + [len(k) for k in self.dictionary.keys()
-                                   ] + [len(k) for k in other.dictionary.keys()])
-        for k, v in self.dictionary.items():
-            pad = list(k) + [0] * (num_variables - len(k))
-            pad = tuple(pad)
-            dictionary[pad] = v
-        for k, v in other.dictionary.items():
-            pad = list(k) + [0] * (num_variables - len(k))
-            pad = tuple(pad)
-            if pad in dictionary.keys():
-                dictionary[pad] = dictionary[pad] + v
+        terms = dict(self.terms)
+        for k, v in other.terms.items():
+            if k in terms:
+                terms[k] = terms[k] + v
             else:
-                dictionary[pad] = v
-        return MPolynomial(dictionary)
+                terms[k] = v
+        return MPolynomial(terms, max(self.num_variables, other.num_variables))
 
-    def __mul__(self, other):
-        dictionary = dict()
-        num_variables = max([len(k) for k in self.dictionary.keys(
-        )] + [len(k) for k in other.dictionary.keys()])
-        for k0, v0 in self.dictionary.items():
-            for k1, v1 in other.dictionary.items():
-                exponent = [0] * num_variables
-                for k in range(len(k0)):
-                    exponent[k] += k0[k]
-                for k in range(len(k1)):
-                    exponent[k] += k1[k]
-                exponent = tuple(exponent)
-                if exponent in dictionary.keys():
-                    dictionary[exponent] = dictionary[exponent] + v0 * v1
+    def multiply_terms(left, right):
+        # exponents add up without carries as long as they fit exponent_bits
+        terms = dict()
+        for k0, v0 in left.items():
+            for k1, v1 in right.items():
+                if k0 + k1 in terms:
+                    terms[k0 + k1] = terms[k0 + k1] + v0 * v1
                 else:
-                    dictionary[exponent] = v0 * v1
-        return MPolynomial(dictionary)
+                    terms[k0 + k1] = v0 * v1
+        return terms
+
+    def __mul__(self, other):
+        return MPolynomial(MPolynomial.multiply_terms(self.terms, other.terms), max(self.num_variables, other.num_variables))
 
     def __sub__(self, other):
         return self + (-other)
 
     def __neg__(self):
-        dictionary = dict()
-        for k, v in self.dictionary.items():
-            dictionary[k] = -v
-        return MPolynomial(dictionary)
+        return MPolynomial({k: -v for k, v in self.terms.items()}, self.num_variables)
 
     def __xor__(self, exponent):
         if self.is_zero():
             return MPolynomial(dict())
-        field = list(self.dictionary.values())[0].field
-        num_variables = len(list(self.dictionary.keys())[0])
-        exp = [0] * num_variables
-        acc = MPolynomial({tuple(exp): field.one()})
+        field = list(self.terms.values())[0].field
+        acc = {0: field.one()}
         for b in bin(exponent)[2:]:
-            acc = acc * acc
+            acc = MPolynomial.multiply_terms(acc, acc)
             if b == '1':
-                acc = acc * self
-        return acc
+                acc = MPolynomial.multiply_terms(acc, self.terms)
+        return MPolynomial(acc, self.num_variables)
 
     def constant(element):
-        return MPolynomial({tuple([0]): element})
+        return MPolynomial({0: element}, 1)
 
     def is_zero(self):
-        if not self.dictionary:
+        if not self.terms:
             return True
         else:
-            for v in self.dictionary.values():
+            for v in self.terms.values():
                 if v.is_zero() == False:
                     return False
             return True
 
     def degree(self):
-        if not self.dictionary:
+        if not self.terms:
             return -1
         return max(sum(k) for k in self.dictionary.keys())
 
@@ -95,25 +109,22 @@ class MPolynomial:
     # with a leading coefficient of one. For three indeterminates, returns:
     # [f(x,y,z) = x, f(x,y,z) = y, f(x,y,z) = z]
     def variables(num_variables: int, field):
-        variables = []
-        for i in range(num_variables):
-            exponent = [0] * i + [1] + [0] * (num_variables - i - 1)
-            variables = variables + \
-                [MPolynomial({tuple(exponent): field.one()})]
-        return variables
+        return [MPolynomial({1 << (MPolynomial.exponent_bits * i): field.one()}, num_variables) for i in range(num_variables)]
+
+    def compile(self):
+        """Return the `EvaluationPlan` of this polynomial, which is built
+        once and then reused by every call to `evaluate`."""
+        if self.plan == None:
+            self.plan = EvaluationPlan(self.dictionary, self.num_variables)
+        return self.plan
 
     def evaluate(self, point):
         acc = point[0].field.zero()
-        if self.degree() == -1:
+        if not self.terms:
             return acc
-        for k, v in self.dictionary.items():
-            prod = v
-            assert(len(point) == len(
-                k)), f"number of elements in point {len(point)} does not match with number of variables {len(k)} for polynomial {str(self)}"
-            for i in range(len(k)):
-                prod = prod * (point[i] ^ k[i])
-            acc = acc + prod
-        return acc
+        assert(len(point) == self.num_variables
+               ), f"number of elements in point {len(point)} does not match with number of variables {self.num_variables} for polynomial {str(self)}"
+        return acc + self.compile().evaluate(point)
 
     def evaluate_symbolic(self, point, memo=dict()):
         field = list(self.dictionary.values())[0].field
@@ -199,3 +210,207 @@ class MPolynomial:
             polynomial += term
 
         return polynomial
+
+
+class EvaluationPlan:
+    """Compiled form of an `MPolynomial` for repeated evaluation. The terms
+    are arranged as a multivariate Horner scheme: nested by variable, with
+    the exponents of each variable in decreasing order, so that
+        sum_e x_i^e * p_e(x_{i+1}, ...)
+    costs one multiplication per distinct exponent of x_i, and partial
+    products are shared by all terms with the same prefix. Evaluating at a
+    point first computes the needed powers of every variable, once."""
+
+    def __init__(self, dictionary, num_variables):
+        self.num_variables = num_variables
+        # exponent differences the Horner steps multiply by, per variable
+        self.steps = [set() for i in range(num_variables)]
+        # the zero polynomial has no terms and is a root of None
+        self.root = None
+        if len(dictionary) != 0:
+            self.root = self.compile(
+                sorted(dictionary.items(), reverse=True), 0)
+        self.max_steps = [max([0] + list(s)) for s in self.steps]
+
+    def compile(self, terms, index):
+        # terms: (exponents, coefficient) pairs in decreasing order; a node is
+        # either a coefficient or a pair (variable index, branches)
+        while index < self.num_variables and all(exponents[index] == 0 for exponents, c in terms):
+            index += 1
+        if index == self.num_variables:
+            return terms[0][1]
+
+        branches = []
+        start = 0
+        for end in range(1, len(terms)+1):
+            if end == len(terms) or terms[end][0][index] != terms[start][0][index]:
+                branches += [(terms[start][0][index],
+                              self.compile(terms[start:end], index+1))]
+                start = end
+
+        # Horner steps between consecutive exponents, then the last one
+        for (e0, _), (e1, _) in zip(branches, branches[1:]):
+            self.steps[index].add(e0 - e1)
+        if branches[-1][0] != 0:
+            self.steps[index].add(branches[-1][0])
+        return (index, branches)
+
+    def evaluate(self, point):
+        if self.root is None:
+            return point[0].field.zero()
+        assert(len(point) == self.num_variables
+               ), f"number of elements in point {len(point)} does not match with number of variables {self.num_variables}"
+        powers = []
+        for x, max_step in zip(point, self.max_steps):
+            table = [None, x]
+            for e in range(2, max_step+1):
+                table += [table[-1] * x]
+            powers += [table]
+        return EvaluationPlan.evaluate_node(self.root, powers)
+
+    def evaluate_node(node, powers):
+        if type(node) != tuple:
+            return node
+        index, branches = node
+        previous, child = branches[0]
+        acc = EvaluationPlan.evaluate_node(child, powers)
+        for exponent, child in branches[1:]:
+            acc = acc * powers[index][previous - exponent] + \
+                EvaluationPlan.evaluate_node(child, powers)
+            previous = exponent
+        if previous != 0:
+            acc = acc * powers[index][previous]
+        return acc
+
+
+class MExpression:
+    """Multivariate polynomial represented as an expression DAG instead of an
+    expanded dictionary. Arithmetic only creates nodes, and degree bounds are
+    inferred on the DAG, so building constraints and computing their degree
+    bounds never multiplies out any terms. The first call that needs the
+    terms (e.g. `evaluate`) expands the expression into an `MPolynomial` once,
+    directly in its packed representation."""
+
+    def __init__(self, operation, operands=[], value=None, num_variables=0):
+        # operation is one of "zero", "constant", "variable", "add", "neg",
+        # "mul", "pow"; value is the constant, the (index, one) pair of a
+        # variable or the exponent of a power
+        self.operation = operation
+        self.operands = operands
+        self.value = value
+        self.num_variables = max(
+            [num_variables] + [operand.num_variables for operand in operands])
+        self.expanded = None
+
+    def zero():
+        return MExpression("zero")
+
+    def constant(element):
+        return MExpression("constant", value=element, num_variables=1)
+
+    def variables(num_variables: int, field):
+        return [MExpression("variable", value=(i, field.one()), num_variables=num_variables) for i in range(num_variables)]
+
+    def __add__(self, other):
+        return MExpression("add", [self, other])
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __neg__(self):
+        return MExpression("neg", [self])
+
+    def __mul__(self, other):
+        return MExpression("mul", [self, other])
+
+    def __xor__(self, exponent):
+        return MExpression("pow", [self], exponent)
+
+    def symbolic_degree_bound(self, max_degrees):
+        """Same bound as `MPolynomial.symbolic_degree_bound` on the expanded
+        polynomial, unless leading terms cancel in the expansion, in which
+        case this bound is larger but still sound."""
+        assert(len(max_degrees) >= self.num_variables or self.operation in ["zero", "constant"]
+               ), f"max degrees length ({len(max_degrees)}) does not match with number of variables ({self.num_variables})"
+        return self.degree_bound(max_degrees, dict())
+
+    def degree_bound(self, max_degrees, memo):
+        if id(self) in memo:
+            return memo[id(self)]
+        bounds = [operand.degree_bound(max_degrees, memo)
+                  for operand in self.operands]
+        if self.operation == "zero":
+            bound = -1
+        elif self.operation == "constant":
+            bound = -1 if self.value.is_zero() else 0
+        elif self.operation == "variable":
+            bound = max_degrees[self.value[0]]
+        elif self.operation == "add":
+            bound = max(bounds)
+        elif self.operation == "neg":
+            bound = bounds[0]
+        elif self.operation == "mul":
+            bound = -1 if -1 in bounds else sum(bounds)
+        else:
+            bound = -1 if bounds[0] == -1 else bounds[0] * self.value
+        memo[id(self)] = bound
+        return bound
+
+    def packed_terms(self, memo):
+        if id(self) in memo:
+            return memo[id(self)]
+        operands = [operand.packed_terms(memo) for operand in self.operands]
+        if self.operation == "zero":
+            terms = dict()
+        elif self.operation == "constant":
+            terms = {0: self.value}
+        elif self.operation == "variable":
+            index, one = self.value
+            terms = {1 << (MPolynomial.exponent_bits * index): one}
+        elif self.operation == "add":
+            terms = dict(operands[0])
+            for k, v in operands[1].items():
+                if k in terms:
+                    terms[k] = terms[k] + v
+                else:
+                    terms[k] = v
+        elif self.operation == "neg":
+            terms = {k: -v for k, v in operands[0].items()}
+        elif self.operation == "mul":
+            terms = MPolynomial.multiply_terms(operands[0], operands[1])
+        elif not operands[0]:
+            terms = dict()
+        else:
+            one = list(operands[0].values())[0].field.one()
+            terms = {0: one}
+            for b in bin(self.value)[2:]:
+                terms = MPolynomial.multiply_terms(terms, terms)
+                if b == '1':
+                    terms = MPolynomial.multiply_terms(terms, operands[0])
+        memo[id(self)] = terms
+        return terms
+
+    def expand(self):
+        if self.expanded == None:
+            self.expanded = MPolynomial(
+                self.packed_terms(dict()), self.num_variables)
+        return self.expanded
+
+    @property
+    def dictionary(self):
+        return self.expand().dictionary
+
+    def compile(self):
+        return self.expand().compile()
+
+    def evaluate(self, point):
+        return self.expand().evaluate(point)
+
+    def is_zero(self):
+        return self.expand().is_zero()
+
+    def degree(self):
+        return self.expand().degree()
+
+    def __str__(self):
+        return str(self.expand())
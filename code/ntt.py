@@ -1,4 +1,5 @@
 from univariate import *
+from extension_field import ExtensionField, ExtensionFieldElement
 
 
 def ntt(primitive_root, values):
@@ -15,12 +16,29 @@ def ntt(primitive_root, values):
     assert(primitive_root ^ (len(values)//2) != field.one()
            ), f"primitive root {primitive_root} is not primitive nth root of unity, where n is {len(values)}; powered to half-n the root gives {primitive_root^(len(values)//2)}"
 
+    return radix2_ntt(primitive_root, values)
+
+
+def radix2_ntt(primitive_root, values):
+    # the order of primitive_root is checked once, by ntt
+    if len(values) == 1:
+        return values
+
     half = len(values) // 2
+    square = primitive_root * primitive_root
+
+    odds = radix2_ntt(square, values[1::2])
+    evens = radix2_ntt(square, values[::2])
 
-    odds = ntt(primitive_root ^ 2, values[1::2])
-    evens = ntt(primitive_root ^ 2, values[::2])
+    # twiddle factors are accumulated by multiplication; the upper half
+    # uses primitive_root^(i+half) = -primitive_root^i
+    products = []
+    twiddle = primitive_root.field.one()
+    for odd in odds:
+        products += [twiddle * odd]
+        twiddle = twiddle * primitive_root
 
-    return [evens[i % half] + (primitive_root ^ i) * odds[i % half] for i in range(len(values))]
+    return [e + p for (e, p) in zip(evens, products)] + [e - p for (e, p) in zip(evens, products)]
 
 
 def intt(primitive_root, values):
@@ -168,6 +186,33 @@ def fast_coset_evaluate(polynomial, offset, generator, order):
     return values
 
 
+def subgroup_interpolate(root, values, field):
+    """Coefficients of the polynomial of degree less than len(values) that
+    takes `values` on the powers of `root`, a primitive len(values)-th
+    root of unity of the base field. The values are elements of `field`,
+    and for an extension field every limb is interpolated separately; each
+    interpolation is one inverse NTT on integers."""
+    base_field = root.field
+    p = base_field.p
+    n = len(values)
+    inverse_root = root.inverse().value
+    ninv = base_field(n).inverse().value
+    if type(field) != ExtensionField:
+        coefficients = integer_ntt([v.value for v in values], inverse_root, p)
+        return [BaseFieldElement(c * ninv % p, base_field) for c in coefficients]
+
+    extension_degree = field.modulus.degree()
+    components = [[0] * n for k in range(extension_degree)]
+    for i in range(n):
+        limbs = field.lift(values[i]).polynomial.coefficients
+        for k in range(len(limbs)):
+            components[k][i] = limbs[k].value
+    components = [integer_ntt(component, inverse_root, p)
+                  for component in components]
+    return [ExtensionFieldElement(Polynomial([BaseFieldElement(c * ninv % p, base_field) for c in limbs]), field)
+            for limbs in zip(*components)]
+
+
 def fast_coset_interpolate(offset, generator, values):
     coefficients = intt(generator, values)
     poly = Polynomial(coefficients)
@@ -177,6 +222,8 @@ def fast_coset_interpolate(offset, generator, values):
 def batch_inverse(array):
     assert(all(not a.is_zero() for a in array)
            ), "batch inverse does not work when input contains a zero"
+    if len(array) > 0 and type(array[0]) == BaseFieldElement:
+        return array[0].field.batch_inverse(array)
     products = [a for a in array]
     for i in range(1, len(array)):
         products[i] = products[i-1] * array[i]
@@ -1,5 +1,5 @@
 
-from ntt import batch_inverse
+from table import ZerofierCache
 
 
 class PermutationArgument:
@@ -8,14 +8,13 @@ class PermutationArgument:
         self.lhs = lhs
         self.rhs = rhs
 
-    def quotient(self, fri_domain):
-        field = fri_domain.omega.field
+    def quotient(self, fri_domain, zerofiers=None):
+        if zerofiers == None:
+            zerofiers = ZerofierCache(fri_domain)
         difference_codeword = [l - r for l, r in zip(self.all_tables[self.lhs[0]].codewords[self.lhs[1]],
                                                      self.all_tables[self.rhs[0]].codewords[self.rhs[1]])]
-        zerofier = [fri_domain(i) - field.one()
-                    for i in range(fri_domain.length)]
-        zerofier_inverse = batch_inverse(zerofier)
-        quotient_codeword = [d * d.field.lift(z)
+        zerofier_inverse = zerofiers.boundary()
+        quotient_codeword = [d * z
                              for d, z in zip(difference_codeword, zerofier_inverse)]
         return quotient_codeword
 
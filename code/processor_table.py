@@ -1,4 +1,5 @@
 from table import *
+from scan import affine_scan
 
 
 class ProcessorTable(Table):
@@ -35,32 +36,32 @@ class ProcessorTable(Table):
             self.matrix += [new_row]
 
     @staticmethod
-    def if_instruction(instruction, indeterminate: MPolynomial):
+    def if_instruction(instruction, indeterminate: MExpression):
         '''if_instruction(instr, X)
         returns a polynomial in X that evaluates to 0 in X=FieldElement(instr)'''
         field = list(indeterminate.dictionary.values())[0].field
         # max degree 1
-        return MPolynomial.constant(field(ord(instruction))) - indeterminate
+        return MExpression.constant(field(ord(instruction))) - indeterminate
 
     @staticmethod
-    def ifnot_instruction(instruction, indeterminate: MPolynomial):
+    def ifnot_instruction(instruction, indeterminate: MExpression):
         '''ifnot_instruction(instr, X)
         returns a polynomial in X that evaluates to 0 in all instructions except for X=FieldElement(instr)'''
         field = list(indeterminate.dictionary.values())[0].field
-        one = MPolynomial.constant(field.one())
+        one = MExpression.constant(field.one())
         acc = one
         for c in "[]<>,.+-":
             if c != instruction:
                 acc *= indeterminate - \
-                    MPolynomial.constant(field(ord(c)))
+                    MExpression.constant(field(ord(c)))
         return acc  # max degree: 7
 
     @staticmethod
     def instruction_polynomials(instr, cycle, instruction_pointer, current_instruction, next_instruction, memory_pointer, memory_value, memory_value_inverse, cycle_next, instruction_pointer_next, current_instruction_next, next_instruction_next, memory_pointer_next, memory_value_next, memory_value_inverse_next):
-        zero = MPolynomial.zero()
+        zero = MExpression.zero()
         field = list(cycle.dictionary.values())[0].field
-        one = MPolynomial.constant(field.one())
-        two = MPolynomial.constant(field.one()+field.one())
+        one = MExpression.constant(field.one())
+        two = MExpression.constant(field.one()+field.one())
         polynomials = [zero] * 3
         memory_value_is_zero = memory_value * memory_value_inverse - one
 
@@ -130,9 +131,9 @@ class ProcessorTable(Table):
     @staticmethod
     def transition_constraints_afo_named_variables(cycle, instruction_pointer, current_instruction, next_instruction, memory_pointer, memory_value, memory_value_inverse, cycle_next, instruction_pointer_next, current_instruction_next, next_instruction_next, memory_pointer_next, memory_value_next, memory_value_inverse_next):
         field = list(cycle.dictionary.values())[0].field
-        one = MPolynomial.constant(field.one())
+        one = MExpression.constant(field.one())
 
-        polynomials = [MPolynomial.zero()] * 3
+        polynomials = [MExpression.zero()] * 3
 
         # instruction-specific polynomials
         for c in "[]<>+-,.":
@@ -184,15 +185,15 @@ class ProcessorTable(Table):
             next_instruction_next, \
             memory_pointer_next, \
             memory_value_next, \
-            memory_value_inverse_next = MPolynomial.variables(14, self.field)
+            memory_value_inverse_next = MExpression.variables(14, self.field)
 
         return ProcessorTable.transition_constraints_afo_named_variables(cycle, instruction_pointer, current_instruction, next_instruction, memory_pointer, memory_value, memory_value_inverse, cycle_next, instruction_pointer_next, current_instruction_next, next_instruction_next, memory_pointer_next, memory_value_next, memory_value_inverse_next)
 
     def base_boundary_constraints(self):
         # format: (cycle, polynomial)
-        x = MPolynomial.variables(self.base_width, self.field)
-        one = MPolynomial.constant(self.field.one())
-        zero = MPolynomial.zero()
+        x = MExpression.variables(self.base_width, self.field)
+        one = MExpression.constant(self.field.one())
+        zero = MExpression.zero()
         constraints = [x[ProcessorTable.cycle] - zero,
                        x[ProcessorTable.instruction_pointer] - zero,
                        # ???, # current instruction
@@ -210,15 +211,15 @@ class ProcessorTable(Table):
     @staticmethod
     def instruction_zerofier(current_instruction):
         field = list(current_instruction.dictionary.values())[0].field
-        acc = MPolynomial.constant(field.one())
+        acc = MExpression.constant(field.one())
         for ch in ['[', ']', '<', '>', '+', '-', ',', '.']:
             acc *= current_instruction - \
-                MPolynomial.constant(field(ord(ch)))
+                MExpression.constant(field(ord(ch)))
         return acc
 
     def transition_constraints_ext(self, challenges):
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = [
-            MPolynomial.constant(ch) for ch in challenges]
+            MExpression.constant(ch) for ch in challenges]
         field = challenges[0].field
 
         # names for variables
@@ -243,7 +244,7 @@ class ProcessorTable(Table):
             instruction_permutation_next, \
             memory_permutation_next, \
             input_evaluation_next, \
-            output_evaluation_next = MPolynomial.variables(22, field)
+            output_evaluation_next = MExpression.variables(22, field)
 
         # base AIR polynomials
         polynomials = ProcessorTable.transition_constraints_afo_named_variables(cycle, instruction_pointer, current_instruction, next_instruction, memory_pointer, memory_value,
@@ -282,9 +283,9 @@ class ProcessorTable(Table):
     def boundary_constraints_ext(self, challenges):
         field = challenges[0].field
         # format: mpolynomial
-        x = MPolynomial.variables(self.full_width, field)
-        one = MPolynomial.constant(field.one())
-        zero = MPolynomial.zero()
+        x = MExpression.variables(self.full_width, field)
+        one = MExpression.constant(field.one())
+        zero = MExpression.zero()
         constraints = [x[self.cycle] - zero,
                        x[self.instruction_pointer] - zero,
                        # x[self.current_instruction] - ??),
@@ -304,8 +305,8 @@ class ProcessorTable(Table):
     def terminal_constraints_ext(self, challenges, terminals):
         field = challenges[0].field
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = [
-            MPolynomial.constant(ch) for ch in challenges]
-        x = MPolynomial.variables(self.full_width, field)
+            MExpression.constant(ch) for ch in challenges]
+        x = MExpression.variables(self.full_width, field)
         airs = []
 
         # running product for instruction permutation
@@ -315,7 +316,7 @@ class ProcessorTable(Table):
         #                   - self.b * current_instruction
         #                   - self.c * next_instruction)
         #                 - instruction_permutation_next) * current_instruction]
-        airs += [MPolynomial.constant(terminals[0]) -
+        airs += [MExpression.constant(terminals[0]) -
                  x[ProcessorTable.instruction_permutation]]
 
         # running product for memory permutation
@@ -327,14 +328,14 @@ class ProcessorTable(Table):
         #                   - memory_permutation_next) * current_instruction
         #               + (memory_permutation - memory_permutation_next)
         #                   * ProcessorTable.instruction_zerofier(current_instruction)]
-        airs += [(MPolynomial.constant(terminals[1])
+        airs += [(MExpression.constant(terminals[1])
                   - x[ProcessorTable.memory_permutation]
                   * (beta
                      - d * x[ProcessorTable.cycle]
                      - e * x[ProcessorTable.memory_pointer]
                      - f * x[ProcessorTable.memory_value]))
                  * x[ProcessorTable.current_instruction]
-                 + (MPolynomial.constant(terminals[1]) -
+                 + (MExpression.constant(terminals[1]) -
                     x[ProcessorTable.memory_permutation])
                  * ProcessorTable.instruction_zerofier(x[ProcessorTable.current_instruction])]
 
@@ -343,85 +344,71 @@ class ProcessorTable(Table):
         #                   - input_evaluation * self.gamma \
         #                   - memory_value) * ProcessorTable.ifnot_instruction(',', current_instruction) * current_instruction \
         #               + (input_evaluation_next - input_evaluation) * ProcessorTable.if_instruction(',', current_instruction)]
-        airs += [MPolynomial.constant(terminals[2]) -
+        airs += [MExpression.constant(terminals[2]) -
                  x[ProcessorTable.input_evaluation]]
 
         # running evaluation for output
         # polynomials += [(output_evaluation_next - output_evaluation * self.delta - memory_value) * ProcessorTable.ifnot_instruction(
         #     '.', current_instruction) * current_instruction + (output_evaluation_next - output_evaluation) * ProcessorTable.if_instruction('.', current_instruction)]
-        airs += [MPolynomial.constant(terminals[3]) -
+        airs += [MExpression.constant(terminals[3]) -
                  x[ProcessorTable.output_evaluation]]
 
         assert (len(airs) ==
                 4), "number of terminal airs did not match with expectation"
         return airs
 
-    def extend(self, all_challenges, all_initials):
+    def extend(self, all_challenges, all_initials, num_workers=1, executor=None):
         a, b, c, d, e, f, alpha, beta, gamma, delta, eta = all_challenges
         processor_instruction_permutation_initial, processor_memory_permutation_initial = all_initials
 
         # algebra stuff
         field = self.field
         xfield = a.field
-        one = xfield.one()
         zero = xfield.zero()
 
-        # prepare for loop
-        instruction_permutation_running_product = processor_instruction_permutation_initial
-        memory_permutation_running_product = processor_memory_permutation_initial
-        input_evaluation_running_evaluation = zero
-        output_evaluation_running_evaluation = zero
-
-        # loop over all rows
+        # per-row factors of the running products and evaluations, computed
+        # column-wise; None marks a row that leaves the accumulator as is
+        cycle, instruction_pointer, current_instruction, next_instruction, memory_pointer, memory_value = [
+            [row[j] for row in self.matrix] for j in [ProcessorTable.cycle, ProcessorTable.instruction_pointer, ProcessorTable.current_instruction,
+                                                      ProcessorTable.next_instruction, ProcessorTable.memory_pointer, ProcessorTable.memory_value]]
+        read = BaseFieldElement(ord(','), field)
+        write = BaseFieldElement(ord('.'), field)
+
+        # 1. running product for instruction permutation, unless padding
+        instruction_factors = [alpha - a * ip - b * ci - c * ni if not ci.is_zero() else None
+                               for ip, ci, ni in zip(instruction_pointer, current_instruction, next_instruction)]
+        # 2. running product for memory access
+        memory_factors = [beta - d * clk - e * mp - f * mv if not ci.is_zero() else None
+                          for clk, mp, mv, ci in zip(cycle, memory_pointer, memory_value, current_instruction)]
+        # 3. evaluation for input; the memory-value register only assumes
+        # the input value after the instruction has been performed
+        input_multipliers = [gamma if ci == read else None
+                             for ci in current_instruction]
+        input_addends = [memory_value[i+1] if current_instruction[i] == read else None
+                         for i in range(len(self.matrix))]
+        # 4. evaluation for output
+        output_multipliers = [delta if ci == write else None
+                              for ci in current_instruction]
+
+        instruction_permutation = affine_scan(
+            processor_instruction_permutation_initial, instruction_factors, num_workers=num_workers, executor=executor)
+        memory_permutation = affine_scan(
+            processor_memory_permutation_initial, memory_factors, num_workers=num_workers, executor=executor)
+        input_evaluation = affine_scan(
+            zero, input_multipliers, input_addends, num_workers, executor)
+        output_evaluation = affine_scan(
+            zero, output_multipliers, memory_value, num_workers, executor)
+
+        # every row holds the accumulators before it is applied
         extended_matrix = []
         for i in range(len(self.matrix)):
-            row = self.matrix[i]
-
-            # first, copy over existing row
-            new_row = [xfield.lift(nr) for nr in row]
-
-            # next, define the additional columns
-
-            # 1. running product for instruction permutation
-            new_row += [instruction_permutation_running_product]
-            # if not padding
-            if not new_row[ProcessorTable.current_instruction].is_zero():
-                instruction_permutation_running_product *= alpha - \
-                    a * new_row[ProcessorTable.instruction_pointer] - \
-                    b * new_row[ProcessorTable.current_instruction] - \
-                    c * new_row[ProcessorTable.next_instruction]
-                # print("%i." % i, instruction_permutation_running_product)
-
-            # 2. running product for memory access
-            new_row += [memory_permutation_running_product]
-            if not new_row[ProcessorTable.current_instruction].is_zero():
-                memory_permutation_running_product *= beta \
-                    - d * new_row[ProcessorTable.cycle] \
-                    - e * new_row[ProcessorTable.memory_pointer] \
-                    - f * new_row[ProcessorTable.memory_value]
-
-            # 3. evaluation for input
-            new_row += [input_evaluation_running_evaluation]
-            if row[ProcessorTable.current_instruction] == BaseFieldElement(ord(','), field):
-                input_evaluation_running_evaluation = input_evaluation_running_evaluation * gamma \
-                    + xfield.lift(self.matrix[i+1]
-                                  [ProcessorTable.memory_value])
-                # the memory-value register only assumes the input value after the instruction has been performed
-
-            # 4. evaluation for output
-            new_row += [output_evaluation_running_evaluation]
-            if row[ProcessorTable.current_instruction] == BaseFieldElement(ord('.'), field):
-                output_evaluation_running_evaluation = output_evaluation_running_evaluation * delta \
-                    + new_row[ProcessorTable.memory_value]
-
-            extended_matrix += [new_row]
+            extended_matrix += [self.matrix[i] + [instruction_permutation[i], memory_permutation[i],
+                                                  input_evaluation[i], output_evaluation[i]]]
 
         self.field = xfield
         self.matrix = extended_matrix
-        self.codewords = [[xfield.lift(c) for c in cdwd]
-                          for cdwd in self.codewords]
 
-        self.instruction_permutation_terminal = instruction_permutation_running_product
-        self.memory_permutation_terminal = memory_permutation_running_product
-        self.input_evaluation_terminal = input_evaluation_running_evaluation
-        self.output_evaluation_terminal = output_evaluation_running_evaluation
+        self.instruction_permutation_terminal = instruction_permutation[-1]
+        self.memory_permutation_terminal = memory_permutation[-1]
+        self.input_evaluation_terminal = input_evaluation[-1]
+        self.output_evaluation_terminal = output_evaluation[-1]
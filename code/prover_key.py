@@ -0,0 +1,127 @@
+from algebra import *
+from hashlib import blake2b
+from array import array
+import mmap
+import os
+import pickle
+
+
+class MappedTables:
+    """Dictionary of codewords over the base field that is backed by a
+    memory-mapped file. Codewords read from the file are only turned into
+    field elements when first requested; codewords added at runtime are kept
+    in memory until the owning `ProverKey` is saved."""
+
+    def __init__(self, field, buffer=None, index=None):
+        self.field = field
+        self.buffer = buffer
+        # key -> (offset, length) into buffer
+        self.index = index if index != None else dict()
+        self.tables = dict()
+
+    def __contains__(self, key):
+        return key in self.tables or key in self.index
+
+    def __getitem__(self, key):
+        if key not in self.tables:
+            offset, length = self.index[key]
+            values = self.buffer[offset:offset+8*length].cast("Q")
+            self.tables[key] = [BaseFieldElement(v, self.field)
+                                for v in values]
+        return self.tables[key]
+
+    def __setitem__(self, key, table):
+        self.tables[key] = table
+
+    def keys(self):
+        return set(self.tables.keys()) | set(self.index.keys())
+
+    def raw(self, key):
+        if key in self.tables:
+            return array("Q", [e.value for e in self.tables[key]]).tobytes()
+        offset, length = self.index[key]
+        return bytes(self.buffer[offset:offset+8*length])
+
+
+class ProverKey:
+    """Setup data of the prover that only depends on the table heights and
+    the proof parameters: FRI domain points and power tables, subgroup
+    zerofiers and inverse zerofier codewords. A key starts out empty, is
+    filled as a side effect of proving, and can be saved to a file from which
+    later proofs of the same shape load it lazily."""
+
+    def __init__(self, profile, field=BaseField.main(), buffer=None, index=None):
+        self.profile = profile
+        self.field = field
+        self.buffer = buffer
+        if index == None:
+            index = {"power_tables": dict(), "subgroup_zerofiers": dict(),
+                     "zerofier_inverses": dict()}
+        self.power_tables = MappedTables(
+            field, buffer, index["power_tables"])
+        self.subgroup_zerofiers = MappedTables(
+            field, buffer, index["subgroup_zerofiers"])
+        self.zerofier_inverses = MappedTables(
+            field, buffer, index["zerofier_inverses"])
+
+    @staticmethod
+    def path(directory, profile):
+        digest = blake2b(pickle.dumps(profile), digest_size=16).hexdigest()
+        return os.path.join(directory, f"prover-key-{digest}.bin")
+
+    def save(self, filename):
+        # file layout: header length (8 bytes), pickled header, then all
+        # codewords as 64-bit unsigned integers, 8-byte aligned
+        collections = {"power_tables": self.power_tables,
+                       "subgroup_zerofiers": self.subgroup_zerofiers,
+                       "zerofier_inverses": self.zerofier_inverses}
+        blobs = []
+        index = dict()
+        offset = 0
+        for name, tables in collections.items():
+            index[name] = dict()
+            for key in tables.keys():
+                blob = tables.raw(key)
+                index[name][key] = (offset, len(blob) // 8)
+                blobs += [blob]
+                offset += len(blob)
+        header = pickle.dumps({"profile": self.profile, "index": index})
+        data_offset = 8 + len(header)
+        data_offset += (-data_offset) % 8
+
+        # write to a fresh file, the old one may still be mapped
+        temporary = filename + ".tmp"
+        fh = open(temporary, "wb")
+        fh.write(len(header).to_bytes(8, "little"))
+        fh.write(header)
+        fh.write(bytes(data_offset - 8 - len(header)))
+        for blob in blobs:
+            fh.write(blob)
+        fh.close()
+        os.replace(temporary, filename)
+
+    @staticmethod
+    def load(filename, field=BaseField.main()):
+        fh = open(filename, "rb")
+        buffer = memoryview(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+        fh.close()
+        header_length = int.from_bytes(buffer[:8], "little")
+        header = pickle.loads(buffer[8:8+header_length])
+        data_offset = 8 + header_length
+        data_offset += (-data_offset) % 8
+        index = dict()
+        for name, entries in header["index"].items():
+            index[name] = {key: (data_offset + offset, length)
+                           for key, (offset, length) in entries.items()}
+        return ProverKey(header["profile"], field, buffer, index)
+
+    @staticmethod
+    def open(directory, profile):
+        """Load the key for `profile` from `directory`, or start an empty
+        one if there is none yet."""
+        filename = ProverKey.path(directory, profile)
+        if os.path.exists(filename):
+            key = ProverKey.load(filename)
+            assert (key.profile == profile), f"{filename} holds a prover key for a different profile"
+            return key
+        return ProverKey(profile)
@@ -0,0 +1,47 @@
+from hashlib import shake_256
+from os import urandom
+
+
+class RandomStream:
+    """Random bytes for one proof. The stream is the concatenation of the
+    blocks shake_256(seed || counter), so the operating system is asked
+    for randomness once, for the seed, and salts and randomizers are then
+    read in bulk. Given a fixed `seed` and `block_length`, the stream and
+    hence the proof are reproducible, which is only meant for tests and
+    benchmarks; the same seed with another block length gives a different
+    stream."""
+
+    def __init__(self, seed=None, block_length=1 << 16):
+        if seed == None:
+            seed = urandom(32)
+        self.seed = bytes(seed)
+        self.block_length = block_length
+        self.counter = 0
+        self.buffer = b""
+        self.position = 0
+
+    def read(self, length):
+        # the next `length` bytes of the stream; the missing blocks are
+        # collected first and joined once, so a long read costs linear time
+        available = len(self.buffer) - self.position
+        if available < length:
+            blocks = [self.buffer[self.position:]]
+            while available < length:
+                blocks += [shake_256(self.seed + self.counter.to_bytes(8, "little")
+                                     ).digest(self.block_length)]
+                available += self.block_length
+                self.counter += 1
+            self.buffer = b"".join(blocks)
+            self.position = 0
+        start = self.position
+        self.position += length
+        return self.buffer[start:self.position]
+
+    def chunks(self, count, length):
+        # `count` consecutive byte strings of `length` bytes each
+        data = self.read(count * length)
+        return [data[i:i+length] for i in range(0, count * length, length)]
+
+    def sample(self, field, count, length):
+        """`count` elements of `field`, each sampled from `length` bytes."""
+        return [field.sample(chunk) for chunk in self.chunks(count, length)]
@@ -1,11 +1,12 @@
 from hashlib import blake2b
-from os import urandom
+from randomness import RandomStream
 from binascii import hexlify
 import pickle
+from merkle import Merkle
 
 
 class SaltedMerkle:
-    def __init__(self, data_array):
+    def __init__(self, data_array, randomness=None):
         # calculate depth and next power of two
         self.num_leafs = len(data_array)
         if (self.num_leafs - 1) & self.num_leafs == 0:
@@ -22,7 +23,10 @@ class SaltedMerkle:
         assert(next_power_of_two == 1 << self.depth), f"in SaltedMerkle.__init__, next_power_of_two = {next_power_of_two} =/= 1 << self.depth = {1 << self.depth}"
 
         # append salt to leafs
-        self.leafs = [(element, urandom(24)) for element in data_array]
+        if randomness == None:
+            randomness = RandomStream()
+        self.leafs = list(
+            zip(data_array, randomness.chunks(len(data_array), 24)))
 
         # make room for nodes
         self.nodes = [bytes([0]*32)] * (2 * next_power_of_two)
@@ -66,3 +70,17 @@ class SaltedMerkle:
                 running_hash = blake2b(node + running_hash).digest()
             index >>= 1
         return running_hash == root
+
+    def open_many(self, indices):
+        """Salts of all `indices`, in order, and one authentication path
+        for all of them together; see `Merkle.open_many`."""
+        salts = [self.leafs[index][1] for index in indices]
+        return (salts, Merkle.multi_path(self.nodes, self.depth, indices))
+
+    @staticmethod
+    def verify_many(root, num_leafs, indices, salts, path, elements):
+        leaf_hashes = [blake2b(pickle.dumps(element) + pickle.dumps(salt)).digest()
+                       for element, salt in zip(elements, salts)]
+        if len(leaf_hashes) != len(indices):
+            return False
+        return Merkle.verify_multi_path(root, num_leafs, indices, path, leaf_hashes)
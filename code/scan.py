@@ -0,0 +1,79 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+
+def affine_steps(accumulator, multipliers, addends):
+    """Apply acc <- multipliers[i] * acc + addends[i] for every row i and
+    return the value before every row followed by the final value. A row
+    whose multiplier is None leaves the accumulator unchanged, and an addend
+    of None counts as zero."""
+    values = [accumulator]
+    for multiplier, addend in zip(multipliers, addends):
+        if multiplier is not None:
+            accumulator = multiplier * accumulator
+            if addend is not None:
+                accumulator = accumulator + addend
+        values += [accumulator]
+    return values
+
+
+def compose_chunk(task):
+    # the affine map of a whole chunk: acc -> product * acc + offset
+    zero, multipliers, addends = task
+    product = None
+    for multiplier in multipliers:
+        if multiplier is not None:
+            product = multiplier if product is None else product * multiplier
+    offset = affine_steps(zero, multipliers, addends)[-1]
+    return product, offset
+
+
+def scan_chunk(task):
+    accumulator, multipliers, addends = task
+    return affine_steps(accumulator, multipliers, addends)[1:]
+
+
+def affine_scan(initial, multipliers, addends=None, num_workers=1, executor=None):
+    """Running values of the recurrence acc <- multipliers[i] * acc +
+    addends[i], starting from `initial`: a prefix product when there are no
+    addends, and a prefix Horner evaluation when every multiplier is the same
+    challenge. Returns len(multipliers) + 1 values, the i-th being the
+    accumulator before row i. With `num_workers` other than 1, this is a
+    parallel prefix over that many processes (None: one per core): every
+    chunk of rows is first reduced to one affine map, the maps are chained
+    to find where every chunk starts, and then the chunks are scanned
+    independently. Pass an `executor` to reuse one process pool across
+    scans; otherwise a pool is started for this scan alone."""
+    if addends == None:
+        addends = [None] * len(multipliers)
+    assert (len(addends) == len(multipliers)
+            ), f"number of addends {len(addends)} does not match number of multipliers {len(multipliers)}"
+
+    num_workers = num_workers or os.cpu_count()
+    if num_workers == 1 or len(multipliers) < 2 * num_workers:
+        return affine_steps(initial, multipliers, addends)
+
+    chunk_length = -(-len(multipliers) // num_workers)
+    starts = range(0, len(multipliers), chunk_length)
+    chunks = [(multipliers[start:start+chunk_length], addends[start:start+chunk_length])
+              for start in starts]
+    if executor == None:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            return affine_scan(initial, multipliers, addends, num_workers, executor)
+
+    zero = initial - initial
+    maps = list(executor.map(compose_chunk, [(zero, m, c)
+                                             for m, c in chunks]))
+
+    # chain the chunk maps sequentially; there are only num_workers
+    accumulators = [initial]
+    for product, offset in maps[:-1]:
+        accumulator = accumulators[-1]
+        if product is not None:
+            accumulator = product * accumulator
+        accumulators += [accumulator + offset]
+
+    values = [initial]
+    for chunk_values in executor.map(scan_chunk, [(accumulator, m, c) for accumulator, (m, c) in zip(accumulators, chunks)]):
+        values += chunk_values
+    return values
@@ -0,0 +1,102 @@
+from algebra import *
+from univariate import Polynomial
+from extension_field import ExtensionFieldElement
+from multiprocessing import shared_memory
+
+
+class SharedColumn:
+    """Read and write access to one codeword inside `SharedCodewords`.
+    Elements are decoded from their 64-bit limbs on access."""
+
+    def __init__(self, words, offset, limbs, length, field, xfield):
+        self.words = words
+        self.offset = offset
+        self.limbs = limbs
+        self.length = length
+        self.field = field
+        self.xfield = xfield
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        start = self.offset + index * self.limbs
+        if self.limbs == 1:
+            return BaseFieldElement(self.words[start], self.field)
+        return ExtensionFieldElement(Polynomial([BaseFieldElement(w, self.field) for w in self.words[start:start+self.limbs]]), self.xfield)
+
+    def write(self, start, values):
+        position = self.offset + start * self.limbs
+        for value in values:
+            if self.limbs == 1:
+                self.words[position] = value.value
+            else:
+                coefficients = value.polynomial.coefficients
+                for k in range(self.limbs):
+                    self.words[position+k] = coefficients[k].value if k < len(
+                        coefficients) else 0
+            position += self.limbs
+
+
+class SharedCodewords:
+    """A list of codewords over the base field (one limb per element) or the
+    extension field (three limbs per element), stored as 64-bit limbs in one
+    block of shared memory. Worker processes attach to the block by name
+    instead of receiving a pickled copy of every codeword."""
+
+    def __init__(self, memory, layout, field, xfield, owner):
+        self.memory = memory
+        self.layout = layout  # per codeword: (offset, limbs, length)
+        self.field = field
+        self.xfield = xfield
+        self.owner = owner
+        self.words = memory.buf.cast("Q")
+        self.columns = [SharedColumn(self.words, offset, limbs, length, field, xfield)
+                        for offset, limbs, length in layout]
+
+    @staticmethod
+    def allocate(shapes, field, xfield):
+        """Allocate zeroed codewords, one per (limbs, length) in `shapes`."""
+        layout = []
+        offset = 0
+        for limbs, length in shapes:
+            layout += [(offset, limbs, length)]
+            offset += limbs * length
+        memory = shared_memory.SharedMemory(create=True, size=8*max(1, offset))
+        return SharedCodewords(memory, layout, field, xfield, True)
+
+    @staticmethod
+    def create(codewords, field, xfield):
+        """Copy `codewords` into a fresh block of shared memory."""
+        shapes = [(1 if type(codeword[0]) == BaseFieldElement else 3, len(codeword))
+                  for codeword in codewords]
+        shared = SharedCodewords.allocate(shapes, field, xfield)
+        for column, codeword in zip(shared.columns, codewords):
+            column.write(0, codeword)
+        return shared
+
+    @staticmethod
+    def attach(name, layout, field, xfield):
+        # the creating process owns the block and unlinks it
+        memory = shared_memory.SharedMemory(name=name)
+        return SharedCodewords(memory, layout, field, xfield, False)
+
+    def name(self):
+        return self.memory.name
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __getitem__(self, index):
+        return self.columns[index]
+
+    def codeword(self, index):
+        column = self.columns[index]
+        return [column[i] for i in range(len(column))]
+
+    def close(self):
+        self.columns = []
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
@@ -2,9 +2,67 @@ from abc import abstractmethod
 from random import random
 from multivariate import *
 from ntt import *
+from randomness import RandomStream
 import os
 
 
+def quotient_values(mpo, codewords, zerofier_inverse, xfield, start, stop, shift=None):
+    """Evaluate the quotient of constraint `mpo` on the domain points with
+    indices `start` up to `stop`. Transition constraints also read the row
+    `shift` steps further along the domain."""
+    length = len(zerofier_inverse)
+    values = []
+    for i in range(start, stop):
+        point = [codeword[i] for codeword in codewords]
+        if shift != None:
+            point += [codeword[(i+shift) % length] for codeword in codewords]
+        # base columns and zerofiers stay in the base field; mixed products
+        # are cheaper than lifting them
+        values += [xfield.lift(mpo.evaluate(point) * zerofier_inverse[i])]
+    return values
+
+
+class ZerofierCache:
+    """Inverse zerofier codewords over a FRI domain, computed once per proof
+    and shared by all tables and arguments. Entries are keyed by
+    (kind, height, omicron)."""
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.inverses = dict()
+
+    def boundary(self):
+        # 1 / (x - 1)
+        key = ("boundary", 1, 1)
+        if key not in self.inverses:
+            self.inverses[key] = batch_inverse(
+                self.domain.subgroup_zerofier(1))
+        return self.inverses[key]
+
+    def transition(self, height, omicron):
+        # (x - omicron^-1) / (x^height - 1)
+        key = ("transition", height, omicron.value)
+        if key not in self.inverses:
+            subgroup_zerofier = self.domain.subgroup_zerofier(height)
+            if height != 0:
+                subgroup_zerofier_inverse = batch_inverse(subgroup_zerofier)
+            else:
+                subgroup_zerofier_inverse = subgroup_zerofier
+            omicron_inverse = omicron.inverse()
+            self.inverses[key] = [szi * (x - omicron_inverse)
+                                  for szi, x in zip(subgroup_zerofier_inverse, self.domain.list())]
+        return self.inverses[key]
+
+    def terminal(self, height, omicron):
+        # 1 / (x - omicron^-1)
+        key = ("terminal", height, omicron.value)
+        if key not in self.inverses:
+            omicron_inverse = omicron.inverse()
+            self.inverses[key] = batch_inverse(
+                [x - omicron_inverse for x in self.domain.list()])
+        return self.inverses[key]
+
+
 class Table:
     def __init__(self, field, base_width, full_width, length, num_randomizers, generator, order):
         self.field = field
@@ -109,41 +167,43 @@ class Table:
                 print("indicated challenge:", challenges[self.terminal_index])
                 assert(False)
 
-    def interpolate_columns(self, omega, omega_order, column_indices):
-        assert(omega.has_order_po2(omega_order)
-               ), "omega does not have claimed order"
-
+    def interpolate_columns(self, column_indices, randomness=None):
+        """Interpolate the given columns on the trace domain, the subgroup
+        generated by omicron, and add to every interpolant a random multiple
+        of the trace domain's zerofier x^height - 1 with `num_randomizers`
+        coefficients. That keeps the values on the trace domain, and masks
+        the polynomial everywhere else, at the cost of one inverse NTT per
+        column; the degree is `interpolant_degree`."""
         if self.height == 0:
             return [Polynomial([])] * len(column_indices)
 
+        if randomness == None:
+            randomness = RandomStream()
         polynomials = []
-        omicron_domain = [self.field.lift(self.omicron ^ i)
-                          for i in range(self.height)]
-        randomizer_domain = [self.field.lift(omega^(2*i+1)) # odd powers of omega => no collision with omicron
-                             for i in range(self.num_randomizers)]
-        domain = omicron_domain + randomizer_domain
         for c in column_indices:
             trace = [row[c] for row in self.matrix]
-            randomizers = [self.field.sample(os.urandom(3*8))
-                           for i in range(self.num_randomizers)]
-            values = trace + randomizers
-            assert(len(values) == len(
-                domain)), f"length of domain {len(domain)} and values {len(values)} are unequal"
-            polynomials += [fast_interpolate(domain,
-                                             values,
-                                             self.field.lift(omega), omega_order)]
+            coefficients = subgroup_interpolate(
+                self.omicron, trace, self.field)
+            coefficients += [self.field.zero()] * self.num_randomizers
+            randomizers = randomness.sample(
+                self.field, self.num_randomizers, 3*8)
+            for i in range(self.num_randomizers):
+                coefficients[i] = coefficients[i] - randomizers[i]
+                coefficients[self.height + i] = coefficients[self.height +
+                                                             i] + randomizers[i]
+            polynomials += [Polynomial(coefficients)]
 
         return polynomials
 
-    def lde(self, domain):
+    def lde(self, domain, randomness=None):
         polynomials = self.interpolate_columns(
-            domain.omega, domain.length, column_indices=range(self.base_width))
+            column_indices=range(self.base_width), randomness=randomness)
         self.codewords = [domain.evaluate(p) for p in polynomials]
         return self.codewords
 
-    def ldex(self, domain, xfield):
+    def ldex(self, domain, xfield, randomness=None):
         polynomials = self.interpolate_columns(
-            domain.omega, domain.length, column_indices=range(self.base_width, self.full_width))
+            column_indices=range(self.base_width, self.full_width), randomness=randomness)
         codewords = [domain.xevaluate(p, xfield) for p in polynomials]
         self.codewords += codewords
         return codewords
@@ -152,20 +212,21 @@ class Table:
     def boundary_constraints_ext(self):
         pass
 
-    def boundary_quotients(self, fri_domain, codewords, challenges):
+    def boundary_quotients(self, fri_domain, codewords, challenges, zerofiers=None):
         assert(len(codewords) !=
                0), "'codewords' argument must have nonzero length"
 
+        if zerofiers == None:
+            zerofiers = ZerofierCache(fri_domain)
+
         quotient_codewords = []
         boundary_constraints = self.boundary_constraints_ext(challenges)
-        zerofier = [fri_domain(i) - fri_domain.omega.field.one()
-                    for i in range(fri_domain.length)]
-        zerofier_inverse = batch_inverse(zerofier)
+        zerofier_inverse = zerofiers.boundary()
 
         for l in range(len(boundary_constraints)):
             mpo = boundary_constraints[l]
-            quotient_codewords += [[mpo.evaluate([codewords[j][i] for j in range(
-                self.full_width)]) * self.field.lift(zerofier_inverse[i]) for i in range(fri_domain.length)]]
+            quotient_codewords += [quotient_values(
+                mpo, codewords[:self.full_width], zerofier_inverse, self.field, 0, fri_domain.length)]
 
         if os.environ.get('DEBUG') is not None:
             print(f"before domain interpolation of bq in {type(self)}")
@@ -187,32 +248,19 @@ class Table:
     def transition_constraints_ext(self, challenges):
         pass
 
-    def transition_quotients(self, domain, codewords, challenges):
+    def transition_quotients(self, domain, codewords, challenges, zerofiers=None):
+        if zerofiers == None:
+            zerofiers = ZerofierCache(domain)
 
         quotients = []
-        field = domain.omega.field
-        subgroup_zerofier = [(domain(i) ^ self.height) - field.one()
-                             for i in range(domain.length)]
-        if self.height != 0:
-            subgroup_zerofier_inverse = batch_inverse(subgroup_zerofier)
-        else:
-            subgroup_zerofier_inverse = subgroup_zerofier
-        zerofier_inverse = [subgroup_zerofier_inverse[i] *
-                            (domain(i) - self.omicron.inverse()) for i in range(domain.length)]
+        zerofier_inverse = zerofiers.transition(self.height, self.omicron)
 
         transition_constraints = self.transition_constraints_ext(challenges)
 
         for l in range(len(transition_constraints)):
             mpo = transition_constraints[l]
-            quotient_codeword = []
-            composition_codeword = []
-            for i in range(domain.length):
-                point = [codewords[j][i] for j in range(self.full_width)] + \
-                    [codewords[j][(i+self.unit_distance(domain.length)) %
-                                  domain.length] for j in range(self.full_width)]
-                composition_codeword += [mpo.evaluate(point)]
-                quotient_codeword += [mpo.evaluate(point)
-                                      * self.field.lift(zerofier_inverse[i])]
+            quotient_codeword = quotient_values(mpo, codewords[:self.full_width], zerofier_inverse,
+                                                self.field, 0, domain.length, self.unit_distance(domain.length))
 
             quotients += [quotient_codeword]
 
@@ -221,11 +269,13 @@ class Table:
                 interpolated = domain.xinterpolate(quotients[-1])
                 print(f"degree of interpolation: {interpolated.degree()}")
                 if interpolated.degree() >= domain.length - 1:
+                    ones = [zerofier_inverse[0].field.one()] * domain.length
+                    composition_codeword = quotient_values(
+                        mpo, codewords[:self.full_width], ones, self.field, 0, 5, self.unit_distance(domain.length))
                     print("terminal index:", self.terminal_index)
                     print("self.height:", self.height)
-                    print("point:", ",".join(str(p) for p in point))
                     print("codeword:", ",".join(str(c)
-                          for c in composition_codeword[:5]))
+                          for c in composition_codeword))
                     print("quotient:", ",".join(str(c)
                           for c in quotient_codeword[:5]))
                     assert(False)
@@ -250,16 +300,15 @@ class Table:
     def terminal_constraints_ext(self, challenges, terminals):
         pass
 
-    def terminal_quotients(self, domain, codewords, challenges, terminals):
-        quotient_codewords = []
-
-        zerofier_codeword = [domain(i) - self.omicron.inverse()
-                             for i in range(domain.length)]
+    def terminal_quotients(self, domain, codewords, challenges, terminals, zerofiers=None):
+        if zerofiers == None:
+            zerofiers = ZerofierCache(domain)
 
-        zerofier_inverse = batch_inverse(zerofier_codeword)
+        quotient_codewords = []
+        zerofier_inverse = zerofiers.terminal(self.height, self.omicron)
         for mpo in self.terminal_constraints_ext(challenges, terminals):
-            quotient_codewords += [[mpo.evaluate([codewords[j][i] for j in range(
-                self.full_width)]) * self.field.lift(zerofier_inverse[i]) for i in range(domain.length)]]
+            quotient_codewords += [quotient_values(
+                mpo, codewords[:self.full_width], zerofier_inverse, self.field, 0, domain.length)]
 
         if os.environ.get('DEBUG') is not None:
             for i in range(len(quotient_codewords)):
@@ -291,15 +340,30 @@ class Table:
             max_degrees) - 1 for mpo in self.terminal_constraints_ext(challenges, terminals)]
         return degree_bounds
 
-    def all_quotients(self, domain, codewords, challenges, terminals):
+    def all_quotients(self, domain, codewords, challenges, terminals, zerofiers=None):
+        if zerofiers == None:
+            zerofiers = ZerofierCache(domain)
         boundary_quotients = self.boundary_quotients(
-            domain, codewords, challenges)
+            domain, codewords, challenges, zerofiers)
         transition_quotients = self.transition_quotients(
-            domain, codewords, challenges)
+            domain, codewords, challenges, zerofiers)
         terminal_quotients = self.terminal_quotients(
-            domain, codewords, challenges, terminals)
+            domain, codewords, challenges, terminals, zerofiers)
         return boundary_quotients + transition_quotients + terminal_quotients
 
+    def quotient_constraints(self, domain, challenges, terminals, zerofiers):
+        """List every quotient of this table, in the order of
+        `all_quotients`, as a triple (constraint, zerofier inverse, shift)
+        that `quotient_values` can evaluate on any part of the domain."""
+        shift = self.unit_distance(domain.length)
+        boundary = [(mpo, zerofiers.boundary(), None)
+                    for mpo in self.boundary_constraints_ext(challenges)]
+        transition = [(mpo, zerofiers.transition(self.height, self.omicron), shift)
+                      for mpo in self.transition_constraints_ext(challenges)]
+        terminal = [(mpo, zerofiers.terminal(self.height, self.omicron), None)
+                    for mpo in self.terminal_constraints_ext(challenges, terminals)]
+        return boundary + transition + terminal
+
     def all_quotient_degree_bounds(self, challenges, terminals):
         boundary_degree_bounds = self.boundary_quotient_degree_bounds(
             challenges)
@@ -222,6 +222,187 @@ def test_bfs():
               "".join(output_symbols) + "\"")
 
 
+def test_seeded_proof():
+    program = VirtualMachine.compile("++++")
+    running_time, input_symbols, output_symbols = VirtualMachine.run(program)
+    memory_length = len(VirtualMachine.simulate(program, input_symbols)[1])
+
+    # proving pads the matrices and extends the tables, so every proof
+    # gets fresh ones
+    proofs = []
+    for i in range(2):
+        bfs = BrainfuckStark(running_time, memory_length,
+                             program, input_symbols, output_symbols)
+        proofs += [bfs.prove(program, *VirtualMachine.simulate(
+            program, input_symbols), seed=bytes(32))]
+    assert (proofs[0] == proofs[1]
+            ), "proofs with the same seed should be identical"
+    assert (bfs.verify(proofs[0]) == True), "seeded proof fails to verify"
+
+
+def prove_honestly(code, num_workers=1, **options):
+    # prove an input-free program with the given stark options; returns
+    # the stark and its proof
+    program = VirtualMachine.compile(code)
+    running_time, input_symbols, output_symbols = VirtualMachine.run(program)
+    matrices = VirtualMachine.simulate(program, input_symbols)
+    bfs = BrainfuckStark(running_time, len(matrices[1]),
+                         program, input_symbols, output_symbols, **options)
+    return bfs, bfs.prove(program, *matrices, num_workers=num_workers)
+
+
+def test_parallel_prove():
+    bfs, proof = prove_honestly("++++", num_workers=2)
+    assert (bfs.verify(proof) == True), "proof computed in parallel fails to verify"
+
+
+def test_compressed_proof():
+    bfs, proof = prove_honestly("++++", compress=True)
+    assert (bfs.verify(proof) == True), "compressed proof fails to verify"
+
+
+def test_grouped_proof():
+    for compress in [False, True]:
+        bfs, proof = prove_honestly("++++", compress=compress, grouped=True)
+        assert (bfs.verify(proof) == True
+                ), f"proof with grouped leafs fails to verify (compress={compress})"
+
+
+def test_debug_degree_check(monkeypatch):
+    program = VirtualMachine.compile("++++")
+    running_time, input_symbols, output_symbols = VirtualMachine.run(program)
+    memory_length = len(VirtualMachine.simulate(program, input_symbols)[1])
+    bfs = BrainfuckStark(running_time, memory_length,
+                         program, input_symbols, output_symbols)
+    monkeypatch.setenv("DEBUG", "1")
+
+    degree = 10
+    codeword = bfs.fri.domain.evaluate(Polynomial(
+        [bfs.field.sample(os.urandom(8)) for i in range(degree+1)]))
+    combination = [bfs.xfield.zero()] * bfs.fri.domain.length
+    weights = [bfs.xfield.sample(os.urandom(24)) for i in range(2)]
+    bfs.accumulate_shifted(combination, weights,
+                           codeword, bfs.max_degree - degree)
+    try:
+        bfs.accumulate_shifted(combination, weights,
+                               codeword, bfs.max_degree - degree + 1)
+        caught = False
+    except AssertionError:
+        caught = True
+    assert (caught), "DEBUG mode does not catch a wrong degree bound"
+
+
+def test_verify_batch_rejects_malformed_proofs():
+    program = VirtualMachine.compile("++++")
+    running_time, input_symbols, output_symbols = VirtualMachine.run(program)
+    processor_matrix, memory_matrix, instruction_matrix, input_matrix, output_matrix = VirtualMachine.simulate(
+        program, input_data=input_symbols)
+    bfs = BrainfuckStark(running_time, len(memory_matrix),
+                         program, input_symbols, output_symbols)
+
+    verdicts = bfs.verify_batch(
+        [b"", pickle.dumps([]), pickle.dumps(["not a root"])], num_workers=2)
+    assert (verdicts == [False, False, False]
+            ), "malformed proofs must be rejected one by one"
+
+    # a proof that parses, but holds objects of the wrong shape
+    verdicts = bfs.verify_batch(
+        [pickle.dumps([b"x" * 32] * 40)], num_workers=1)
+    assert (verdicts == [False]
+            ), "proofs with objects of the wrong shape must be rejected"
+
+    # a seeded proof, so that the tampered byte is always the same one
+    proof = bfs.prove(program, processor_matrix, memory_matrix, instruction_matrix,
+                      input_matrix, output_matrix, seed=bytes(32))
+    tampered = bytearray(proof)
+    tampered[len(tampered) // 2] ^= 1
+    verdicts = bfs.verify_batch([proof, bytes(tampered)], num_workers=2)
+    assert (verdicts == [True, False]
+            ), "batch verification must accept the honest proof only"
+
+
+def test_verifying_key(tmp_path):
+    program = VirtualMachine.compile("++++")
+    running_time, input_symbols, output_symbols = VirtualMachine.run(program)
+    processor_matrix, memory_matrix, instruction_matrix, input_matrix, output_matrix = VirtualMachine.simulate(
+        program, input_data=input_symbols)
+    bfs = BrainfuckStark(running_time, len(memory_matrix),
+                         program, input_symbols, output_symbols)
+
+    # degree bounds do not depend on the particular challenges
+    challenges = [bfs.xfield.sample(os.urandom(24)) for i in range(11)]
+    terminals = [bfs.xfield.sample(os.urandom(24)) for i in range(5)]
+    degree_bounds = reduce(lambda x, y: x+y, [table.all_quotient_degree_bounds(challenges, terminals)
+                           for table in bfs.tables], []) + [pa.quotient_degree_bound() for pa in bfs.permutation_arguments]
+    assert (bfs.verifying_key.quotient_degree_bounds == degree_bounds)
+
+    filename = str(tmp_path / "verifying.key")
+    bfs.verifying_key.save(filename)
+    key = VerifyingKey.load(filename)
+    loaded = BrainfuckStark(running_time, len(memory_matrix),
+                            program, input_symbols, output_symbols, verifying_key=key)
+    assert (loaded.max_degree == bfs.max_degree)
+    assert (loaded.fri.domain.length == bfs.fri.domain.length)
+    assert (loaded.verifying_key.quotient_shifts ==
+            bfs.verifying_key.quotient_shifts)
+    assert (bfs.verifying_key.quotient_shifts == [
+            bfs.max_degree - bound for bound in degree_bounds])
+
+
+def test_prover_key(tmp_path):
+    field = BaseField.main()
+    length = 64
+    domain = Fri.Domain(field.generator(), field.primitive_nth_root(length), length)
+    omicron = field.primitive_nth_root(8)
+
+    key = ProverKey(("profile", length))
+    domain.power_tables = key.power_tables
+    domain.zerofiers = key.subgroup_zerofiers
+    zerofiers = ZerofierCache(domain)
+    zerofiers.inverses = key.zerofier_inverses
+    transition = zerofiers.transition(8, omicron)
+    powers = domain.powers(5)
+
+    filename = ProverKey.path(str(tmp_path), key.profile)
+    key.save(filename)
+    loaded = ProverKey.open(str(tmp_path), key.profile)
+    assert (loaded.profile == key.profile)
+    assert (set(loaded.power_tables.keys()) == set(key.power_tables.keys()))
+    assert (loaded.power_tables[5] == powers)
+    assert (loaded.subgroup_zerofiers[8] == domain.subgroup_zerofier(8))
+    assert (loaded.zerofier_inverses[("transition", 8, omicron.value)] == transition)
+
+    # loaded keys can be extended and saved again
+    loaded.power_tables[7] = domain.powers(7)
+    loaded.save(filename)
+    assert (ProverKey.load(filename).power_tables[7] == domain.powers(7))
+    assert (ProverKey.open(str(tmp_path), "other").power_tables.keys() == set())
+
+
+def test_prove_with_prover_key(tmp_path):
+    program = VirtualMachine.compile("++++")
+    running_time, input_symbols, output_symbols = VirtualMachine.run(program)
+    memory_length = len(VirtualMachine.simulate(program, input_symbols)[1])
+
+    # the first proof fills an empty key, the second one reads it back
+    bfs = BrainfuckStark(running_time, memory_length,
+                         program, input_symbols, output_symbols)
+    key = ProverKey.open(str(tmp_path), bfs.prover_profile())
+    proof = bfs.prove(program, *VirtualMachine.simulate(program, input_symbols), prover_key=key)
+    assert (bfs.verify(proof) == True), "proof that fills the key fails to verify"
+    assert (bfs.fri.domain.power_tables is not key.power_tables
+            ), "the key should only be used during the proof"
+    assert (len(key.power_tables.keys()) != 0 and len(key.zerofier_inverses.keys()) != 0)
+    key.save(ProverKey.path(str(tmp_path), bfs.prover_profile()))
+
+    loaded = ProverKey.open(str(tmp_path), bfs.prover_profile())
+    assert (loaded.power_tables.keys() == key.power_tables.keys())
+    fresh = BrainfuckStark(running_time, memory_length,
+                           program, input_symbols, output_symbols)
+    proof = fresh.prove(program, *VirtualMachine.simulate(program, input_symbols), prover_key=loaded)
+    assert (fresh.verify(proof) == True), "proof with a loaded key fails to verify"
+
+
 def set_adversarial_is_zero_value_test():
     program = VirtualMachine.compile("+>[++<-]")
     regular_processor_matrix, regular_instruction_matrix, regular_input_matrix, regular_output_matrix = VirtualMachine.simulate(
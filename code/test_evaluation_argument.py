@@ -0,0 +1,42 @@
+import os
+from evaluation_argument import *
+from extension_field import ExtensionField
+
+
+def test_evaluation_terminal():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+    iota = xfield.sample(os.urandom(24))
+    for length in [0, 1, 63, 64, 65, 150]:
+        symbols = [field.sample(os.urandom(8)) for i in range(length)]
+        expected = xfield.zero()
+        for s in symbols:
+            expected = iota * expected + xfield.lift(s)
+        assert(evaluation_terminal(symbols, iota) ==
+               expected), f"evaluation terminal fail for {length} symbols"
+        assert(evaluation_terminal(symbols, iota) ==
+               expected), f"cached evaluation terminal fail for {length} symbols"
+        assert(EvaluationArgument(0, 0, symbols).compute_terminal([iota]) ==
+               expected), f"evaluation argument fail for {length} symbols"
+
+    # equal symbol sequences share a cache entry, different ones do not
+    symbols = [field.sample(os.urandom(8)) for i in range(10)]
+    assert(Symbols(symbols) == Symbols(list(symbols))
+           and hash(Symbols(symbols)) == hash(Symbols(list(symbols))))
+    assert(Symbols(symbols) != Symbols(symbols[:-1]))
+
+
+def test_program_terminal():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+    a, b, c, eta = [xfield.sample(os.urandom(24)) for i in range(4)]
+    program = [BaseFieldElement(ord(symbol), field) for symbol in "++[>+<-]." * 10]
+
+    # one row per address, and one past the end of the program
+    padded_program = program + [field.zero(), field.zero()]
+    expected = xfield.zero()
+    for i in range(len(program)+1):
+        expected = expected * eta + a * BaseFieldElement(i, field) + \
+            b * padded_program[i] + c * padded_program[i+1]
+    assert(program_terminal(program, a, b, c, eta) ==
+           expected), "program terminal fail"
@@ -1,4 +1,5 @@
 import os
+import pickle
 from extension_field import *
 
 
@@ -19,3 +20,35 @@ def test_xgcd():
 
     assert((a*x) % y == Polynomial([field.one()])
            ), f"inverse fail: a = {a} and x = {x} but a * x mod y = {a*x % y} =/= 1"
+
+
+def test_mixed_arithmetic():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+    a = xfield.sample(os.urandom(8*3))
+    b = field.sample(os.urandom(8))
+    lifted = xfield.lift(b)
+
+    assert(a * b == a * lifted and b * a == lifted * a), "mixed product fail"
+    assert(a + b == a + lifted and b + a == lifted + a), "mixed sum fail"
+    assert(a - b == a - lifted and b - a == lifted - a), "mixed difference fail"
+    assert(a / b == a / lifted and b / a == lifted / a), "mixed quotient fail"
+    assert(b == lifted and lifted == b), "mixed equality fail"
+
+
+def test_interned_constants():
+    xfield = ExtensionField.main()
+    field = xfield.modulus.coefficients[0].field
+
+    assert(field.zero() is field(0) and field.one() is field(1))
+    assert(field(65) is field(field.p + 65)), "small elements are not interned"
+    assert(field(1 << 40) == BaseFieldElement(1 << 40, field))
+    assert(xfield.zero().is_zero() and xfield.one() == field.one())
+    assert(not hasattr(field.one(), "__dict__")
+           ), "field elements should not carry a dict"
+
+    # pickled elements keep their value, and the field rebuilds its constants
+    element = pickle.loads(pickle.dumps(field(7)))
+    assert(element == field(7) and element.field.one().value == 1)
+    element = pickle.loads(pickle.dumps(xfield.sample(os.urandom(24))))
+    assert(element.field.zero().is_zero())
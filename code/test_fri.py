@@ -1,5 +1,6 @@
 from algebra import *
 from fri import *
+import os
 
 
 def test_fri():
@@ -57,3 +58,101 @@ def test_fri():
     assert not fri.verify(
         proof_stream, points), "proof should fail, but is accepted ..."
     print("success! \\o/")
+
+
+def test_fri_options():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+    degree = 63
+    expansion_factor = 16
+    num_colinearity_tests = 17
+    initial_codeword_length = (degree + 1) * expansion_factor
+    omega = field.primitive_nth_root(initial_codeword_length)
+    generator = field.generator()
+
+    polynomial = Polynomial([xfield(i) for i in range(degree+1)])
+    sizes = dict()
+    for compress, grouped in [(False, False), (True, False), (False, True), (True, True)]:
+        fri = Fri(generator, omega, initial_codeword_length,
+                  expansion_factor, num_colinearity_tests, xfield, compress, grouped)
+        codeword = fri.domain.xevaluate(polynomial)
+        root = Merkle(fri.leafs(codeword)).root()
+        proof_stream = ProofStream()
+        fri.prove(codeword, proof_stream)
+        sizes[(compress, grouped)] = len(proof_stream.serialize())
+        assert(fri.verify(proof_stream, root)
+               ), f"valid proof rejected (compress={compress}, grouped={grouped})"
+
+        # a codeword that is not low degree must be rejected
+        codeword = [xfield.zero()] * (degree//3) + codeword[degree//3:]
+        proof_stream = ProofStream()
+        fri.prove(codeword, proof_stream)
+        root = Merkle(fri.leafs(codeword)).root()
+        assert(not fri.verify(proof_stream, root)
+               ), f"invalid proof accepted (compress={compress}, grouped={grouped})"
+
+    assert(sizes[(True, False)] < sizes[(False, False)]
+           ), "compressed proof not smaller than plain proof"
+    assert(sizes[(False, True)] < sizes[(False, False)]
+           ), "proof with grouped leafs not smaller than plain proof"
+
+
+def test_domain_powers():
+    field = BaseField.main()
+    length = 64
+    domain = Fri.Domain(field.generator(), field.primitive_nth_root(length), length)
+
+    points = [(domain.omega ^ i) * domain.offset for i in range(length)]
+    assert(domain.list() == points), "cached domain points are wrong"
+    assert(all(domain(i) == points[i] for i in range(length)))
+    for exponent in [0, 3, 16]:
+        assert(domain.powers(exponent) == [p ^ exponent for p in points]
+               ), f"power table for exponent {exponent} is wrong"
+    assert(domain.subgroup_zerofier(16) == [
+           (p ^ 16) - field.one() for p in points])
+
+
+def test_power_table():
+    field = BaseField.main()
+    offset = field.generator()
+    for order in [1, 2, 8, 32, 512]:
+        base = field.primitive_nth_root(order)
+        points = [offset]
+        for i in range(order - 1):
+            points += [points[-1] * base]
+        assert(base ^ order == field.one()
+               ), f"root of order {order} has the wrong order"
+
+        table = PowerTable(base, order, offset)
+        assert(table.list() == points), f"power table of order {order} is wrong"
+        assert(all(table(i) == points[i] for i in range(order)))
+        assert(table(order + 1) == points[1 % order]
+               ), "indices are not reduced modulo the order"
+        assert(PowerTable(base, order).list() == [p / offset for p in points])
+
+
+def test_domain_coset_evaluate():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+    length = 64
+    domain = Fri.Domain(field.generator(), field.primitive_nth_root(length), length)
+    points = [(domain.omega ^ i) * domain.offset for i in range(length)]
+
+    for degree in [-1, 0, 4, 7, 8, 63]:
+        polynomial = Polynomial([field.sample(os.urandom(8))
+                                for i in range(degree+1)])
+        assert(domain.evaluate(polynomial) == [polynomial.evaluate(p) for p in points]
+               ), f"coset evaluation of degree {degree} polynomial is wrong"
+        xpolynomial = Polynomial([xfield.sample(os.urandom(24))
+                                 for i in range(degree+1)])
+        assert(domain.xevaluate(xpolynomial, xfield) == [xpolynomial.evaluate(xfield.lift(p)) for p in points]
+               ), f"coset evaluation of degree {degree} extension field polynomial is wrong"
+
+    # evaluate only some of the cosets
+    polynomial = Polynomial([field.sample(os.urandom(8)) for i in range(8)])
+    codeword = domain.evaluate(polynomial, num_cosets=8, cosets=[2, 5])
+    for i in range(length):
+        if i % 8 in [2, 5]:
+            assert(codeword[i] == polynomial.evaluate(points[i]))
+        else:
+            assert(codeword[i] is None)
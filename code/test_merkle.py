@@ -98,3 +98,41 @@ def test_merkle():
             fake_path = path[0:j] + [urandom(32)] + path[j+1:]
             assert(False == Merkle.verify(
                 root, i, fake_path, elements[i]))
+
+
+def test_merkle_open_many():
+    n = 64
+    elements = [urandom(int(urandom(1)[0])) for i in range(n)]
+    tree = Merkle(elements)
+    root = tree.root()
+    salted_tree = SaltedMerkle(elements)
+    salted_root = salted_tree.root()
+
+    for indices in [[5], [0, 1], [3, 9, 9, 40, 41, 63], list(range(n))]:
+        path = tree.open_many(indices)
+        opened = [elements[i] for i in indices]
+        assert(Merkle.verify_many(root, n, indices, path, opened))
+        salts, salted_path = salted_tree.open_many(indices)
+        assert(SaltedMerkle.verify_many(
+            salted_root, n, indices, salts, salted_path, opened))
+
+        # shared nodes are sent once
+        assert(len(path) <= sum(len(tree.open(i)) for i in set(indices)))
+        if len(set(indices)) > 1:
+            assert(len(path) < sum(len(tree.open(i)) for i in set(indices)))
+
+        # wrong elements, wrong indices and altered paths are rejected
+        wrong = [elements[(i+1) % n] for i in indices]
+        assert(False == Merkle.verify_many(root, n, indices, path, wrong))
+        shifted = [(i+1) % n for i in indices]
+        if len(set(indices)) < n:
+            assert(False == Merkle.verify_many(
+                root, n, shifted, path, opened))
+        for j in range(len(path)):
+            fake_path = path[0:j] + [urandom(32)] + path[j+1:]
+            assert(False == Merkle.verify_many(
+                root, n, indices, fake_path, opened))
+        assert(False == Merkle.verify_many(
+            root, n, indices, path + [urandom(32)], opened))
+        assert(False == SaltedMerkle.verify_many(
+            salted_root, n, indices, salts, salted_path, wrong))
@@ -1,5 +1,5 @@
 from algebra import *
-from multivariate import MPolynomial
+from multivariate import MPolynomial, MExpression
 from extension_field import *
 from univariate import *
 from ntt import *
@@ -42,3 +42,77 @@ def test_symbolic_bounds_zero_coefficient_non_zero_input():
     sym_eval_new = new_mpolynomial.symbolic_degree_bound(max_degrees)
     assert(sym_eval_new != 9)
     print("Test succeeded \\0/")
+
+
+def test_expression_matches_mpolynomial():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+    constant = xfield.sample(os.urandom(24))
+
+    results = []
+    for algebra in [MPolynomial, MExpression]:
+        x, y, z = algebra.variables(3, xfield)
+        c = algebra.constant(constant)
+        shared = x * y - c
+        results += [[(shared ^ 3) * z + shared * (x - algebra.zero()),
+                     (z ^ 2) * (y ^ 0) - algebra.constant(xfield.one()),
+                     c * shared - algebra.zero() * y]]
+
+    point = [xfield.sample(os.urandom(24)) for i in range(3)]
+    for polynomial, expression in zip(*results):
+        assert(expression.expand().dictionary == polynomial.dictionary
+               ), "expanded expression differs from polynomial"
+        assert(expression.evaluate(point) == polynomial.evaluate(point))
+        assert(expression.symbolic_degree_bound([5] * 3) ==
+               polynomial.symbolic_degree_bound([5] * 3))
+        assert(expression.symbolic_degree_bound([-1] * 3) ==
+               polynomial.symbolic_degree_bound([-1] * 3))
+
+
+def test_packed_representation():
+    field = BaseField.main()
+    dictionary = {(0, 2, 1): field(3), (4, 0, 0): field(5), (0, 0, 0): field(7)}
+    polynomial = MPolynomial(dictionary)
+    assert(polynomial.dictionary == dictionary)
+    assert(polynomial.num_variables == 3)
+    assert(polynomial.degree() == 4)
+
+    x, y, z = MPolynomial.variables(3, field)
+    assert((MPolynomial.constant(field(3)) * (y ^ 2) * z + MPolynomial.constant(field(5))
+           * (x ^ 4) + MPolynomial.constant(field(7))).dictionary == dictionary)
+
+    point = [field.sample(os.urandom(8)) for i in range(3)]
+    expected = field(3) * (point[1] ^ 2) * point[2] + \
+        field(5) * (point[0] ^ 4) + field(7)
+    assert(polynomial.evaluate(point) == expected)
+    assert(polynomial.evaluate_symbolic([Polynomial([p]) for p in point]) == Polynomial([expected]))
+    partial = polynomial.partial_evaluate({0: point[0], 2: point[2]})
+    assert(partial.evaluate([field.zero(), point[1], field.zero()]) == expected)
+
+
+def test_evaluation_plan():
+    field = ExtensionField.main()
+    num_variables = 6
+    dictionary = dict()
+    for i in range(40):
+        exponents = tuple(int(b) % 4 for b in os.urandom(num_variables))
+        dictionary[exponents] = field.sample(os.urandom(24))
+    polynomial = MPolynomial(dictionary)
+
+    plan = polynomial.compile()
+    assert(polynomial.compile() is plan), "evaluation plan is not reused"
+    for i in range(3):
+        point = [field.sample(os.urandom(24)) for j in range(num_variables)]
+        expected = field.zero()
+        for exponents, coefficient in dictionary.items():
+            term = coefficient
+            for x, e in zip(point, exponents):
+                term = term * (x ^ e)
+            expected = expected + term
+        assert(plan.evaluate(point) == expected), "evaluation plan is wrong"
+        assert(polynomial.evaluate(point) == expected)
+
+    # the zero polynomial compiles to a plan that evaluates to zero
+    for zero in [MPolynomial.zero(), MPolynomial(dict(), num_variables)]:
+        assert(zero.compile().evaluate(point) == field.zero()
+               ), "plan of the zero polynomial is wrong"
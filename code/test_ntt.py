@@ -1,7 +1,9 @@
 from algebra import *
 from univariate import *
 from ntt import *
+from extension_field import ExtensionField
 import os
+import pickle
 
 
 def test_ntt():
@@ -64,6 +66,27 @@ def test_multiply():
                slow_product), "fast product does not equal slow product"
 
 
+
+def test_multiply_dispatch():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+
+    # sizes on either side of the schoolbook, Karatsuba and NTT thresholds,
+    # balanced and unbalanced, dense and sparse
+    for lhs_length, rhs_length in [(3, 5), (20, 33), (130, 140), (300, 7), (200, 401)]:
+        lhs = [field.sample(os.urandom(8)) for i in range(lhs_length)]
+        rhs = [field.sample(os.urandom(8)) for i in range(rhs_length)]
+        sparse = [field.zero()] * (lhs_length - 1) + [field.one()]
+        for left, right in [(lhs, rhs), (sparse, rhs)]:
+            product = Polynomial(left) * Polynomial(right)
+            assert(product == Polynomial(Polynomial.schoolbook(left, right))
+                   ), f"product of lengths {lhs_length} and {rhs_length} fails"
+
+        xlhs = [xfield.sample(os.urandom(24)) for i in range(lhs_length)]
+        product = Polynomial(xlhs) * Polynomial(rhs)
+        assert(product == Polynomial(Polynomial.schoolbook(xlhs, rhs))
+               ), f"extension field product of lengths {lhs_length} and {rhs_length} fails"
+
 def test_divide():
     field = BaseField.main()
 
@@ -87,6 +110,45 @@ def test_divide():
         assert(quotient == rhs), "fast divide does not equal original factor"
 
 
+
+
+def test_normalized_polynomial():
+    field = BaseField.main()
+    zero, one = field.zero(), field.one()
+
+    polynomial = Polynomial([one, zero, one, zero, zero])
+    assert(polynomial.degree() == 2 and len(polynomial.coefficients) == 3)
+    assert(Polynomial([zero, zero]).is_zero())
+
+    # integer and element forms agree, and pickle the same way
+    product = polynomial * polynomial
+    assert(product.elements == None), "product should be held as integers"
+    assert(product == Polynomial([one, zero, one + one, zero, one]))
+    assert(pickle.dumps(product) == pickle.dumps(
+        Polynomial(product.coefficients)))
+
+def test_long_and_newton_division():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+
+    # the divisor is reused, so the second Newton division hits the cache
+    divisor = Polynomial([field.sample(os.urandom(8)) for i in range(300)])
+    for numerator_length in [10, 200, 700, 700]:
+        numerator = Polynomial([field.sample(os.urandom(8))
+                               for i in range(numerator_length)])
+        for denominator in [divisor, Polynomial([field.one(), field.one()])]:
+            quotient, remainder = Polynomial.divide(numerator, denominator)
+            assert(quotient * denominator + remainder ==
+                   numerator), "division fails"
+            assert(remainder.degree() < denominator.degree()
+                   ), "remainder degree too large"
+
+    numerator = Polynomial([xfield.sample(os.urandom(24)) for i in range(30)])
+    denominator = Polynomial([xfield.sample(os.urandom(24)) for i in range(7)])
+    quotient, remainder = Polynomial.divide(numerator, denominator)
+    assert(quotient * denominator + remainder ==
+           numerator), "extension field division fails"
+
 def test_interpolate():
     field = BaseField.main()
 
@@ -114,6 +176,27 @@ def test_interpolate():
         print("")
 
 
+def test_subgroup_interpolate():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+
+    for n in [1, 2, 64]:
+        root = field.primitive_nth_root(n)
+        domain = [root ^ i for i in range(n)]
+
+        values = [field.sample(os.urandom(8)) for i in range(n)]
+        poly = Polynomial(subgroup_interpolate(root, values, field))
+        assert(poly.degree() < n and poly.evaluate_domain(domain) == values
+               ), "base field interpolant is wrong"
+
+        # extension field values, some of them given as base field elements
+        values = [xfield.sample(os.urandom(24)) if i % 3 != 0 else field.sample(os.urandom(8))
+                  for i in range(n)]
+        poly = Polynomial(subgroup_interpolate(root, values, xfield))
+        assert(poly.degree() < n and all(poly.evaluate(xfield.lift(x)) == v for x, v in zip(domain, values))
+               ), "extension field interpolant is wrong"
+
+
 def test_coset_evaluate():
     field = BaseField.main()
 
@@ -142,3 +225,9 @@ def test_batch_inverse():
     array = [field.sample(os.urandom(8)) for i in range(n)]
     inverses = batch_inverse(array)
     assert(all((i*a) == field.one() for i, a in zip(inverses, array)))
+    assert(batch_inverse(array[:1]) == [array[0].inverse()])
+
+    xfield = ExtensionField.main()
+    array = [xfield.sample(os.urandom(24)) for i in range(n)]
+    inverses = batch_inverse(array)
+    assert(all((i*a) == xfield.one() for i, a in zip(inverses, array)))
@@ -0,0 +1,32 @@
+from randomness import *
+import time
+from extension_field import ExtensionField
+
+
+def test_random_stream():
+    seed = bytes(range(32))
+    stream = RandomStream(seed, block_length=40)
+    data = stream.read(7) + b"".join(stream.chunks(10, 9)) + stream.read(100)
+    assert(data == RandomStream(seed, block_length=40).read(len(data))
+           ), "stream depends on how it is read"
+    assert(data != RandomStream(bytes(32)).read(len(data)))
+    assert(data != RandomStream(seed, block_length=64).read(len(data))
+           ), "the block length is part of the stream"
+    assert(RandomStream().read(32) != RandomStream().read(32)
+           ), "unseeded streams should differ"
+
+    xfield = ExtensionField.main()
+    elements = RandomStream(seed).sample(xfield, 5, 24)
+    assert(elements == [xfield.sample(chunk)
+           for chunk in RandomStream(seed).chunks(5, 24)])
+
+
+def test_random_stream_bulk():
+    # salts for a large tree come from one read, which must not be
+    # quadratic in the number of blocks
+    count = 1 << 20
+    start = time.time()
+    salts = RandomStream(bytes(32)).chunks(count, 24)
+    assert(len(salts) == count and all(len(salt) == 24 for salt in salts[:100]))
+    assert(time.time() - start < 10), "bulk reads are too slow"
+    assert(salts[-1] == RandomStream(bytes(32)).read(count * 24)[-24:])
@@ -0,0 +1,34 @@
+import os
+from scan import *
+from extension_field import ExtensionField
+from algebra import *
+
+
+def test_affine_scan():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+    n = 37
+    initial = xfield.sample(os.urandom(24))
+    multipliers = [xfield.sample(os.urandom(24)) if i % 5 != 0 else None
+                   for i in range(n)]
+    addends = [field.sample(os.urandom(8)) for i in range(n)]
+
+    # prefix product
+    expected = [initial]
+    for m in multipliers:
+        expected += [expected[-1] * m if m is not None else expected[-1]]
+    assert(affine_scan(initial, multipliers) == expected), "prefix product fail"
+
+    # prefix Horner evaluation
+    expected = [initial]
+    for m, c in zip(multipliers, addends):
+        expected += [expected[-1] * m + c if m is not None else expected[-1]]
+    assert(affine_scan(initial, multipliers, addends) == expected), "affine scan fail"
+    assert(affine_scan(initial, multipliers, addends, num_workers=3)
+           == expected), "parallel affine scan fail"
+
+    # one pool shared by several scans
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        for workers in [2, 3, 5]:
+            assert(affine_scan(initial, multipliers, addends, workers, executor)
+                   == expected), f"affine scan with shared pool fail ({workers} chunks)"
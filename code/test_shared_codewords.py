@@ -0,0 +1,26 @@
+import os
+from shared_codewords import *
+from extension_field import ExtensionField
+
+
+def test_shared_codewords():
+    field = BaseField.main()
+    xfield = ExtensionField.main()
+    n = 16
+    base = [field.sample(os.urandom(8)) for i in range(n)]
+    extension = [xfield.sample(os.urandom(24)) for i in range(n)]
+    extension[3] = xfield.zero()
+    extension[5] = xfield.lift(base[5])
+
+    shared = SharedCodewords.create([base, extension], field, xfield)
+    attached = SharedCodewords.attach(
+        shared.name(), shared.layout, field, xfield)
+    assert(attached.codeword(0) == base), "base field codeword is corrupted"
+    assert(attached.codeword(1) == extension), "extension field codeword is corrupted"
+
+    # writes through one handle are visible through the other
+    attached[1].write(4, extension[:2])
+    assert(shared[1][4] == extension[0] and shared[1][5] == extension[1])
+
+    attached.close()
+    shared.close()
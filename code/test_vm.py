@@ -1,5 +1,6 @@
 from extension_field import ExtensionField
 from vm import *
+from randomness import RandomStream
 import os
 
 
@@ -133,3 +134,63 @@ def test_extend():
 
     # assert(processor_extension.output_evaluation_terminal ==
     #        VirtualMachine.evaluation_terminal([row[0] for row in output_table.table], delta)), f"processor output evaluation == {processor_extension.output_evaluation_terminal} =/= locally computed output evaluation == {VirtualMachine.evaluation_terminal(output_table.table, delta)}"
+
+
+def test_input_source(tmp_path):
+    program = VirtualMachine.compile(",[.,]")
+    text = "".join(chr(33 + i % 90) for i in range(5000))
+
+    # the same input from memory, a file read in small chunks, and an iterator
+    path = tmp_path / "input"
+    path.write_bytes(text.encode())
+    with open(path, "rb") as fh:
+        sources = [InputSource(text.encode() + b"\0"),
+                   InputSource(fh, buffer_length=7),
+                   InputSource(iter([text[:100], b"", text[100:].encode(), [0]]))]
+        for source in sources[:1] + sources[2:]:
+            running_time, input_data, output_data = VirtualMachine.run(
+                program, input_source=source)
+            assert("".join(output_data) == text), "program did not echo its input"
+            assert(len(input_data) == len(text) + 1)
+
+        # without a terminating zero, the file runs out
+        try:
+            VirtualMachine.run(program, input_source=sources[1])
+            assert(False), "reading past the end of the input should fail"
+        except AssertionError as e:
+            assert("end of its input" in str(e))
+
+    # input data comes before the input source, in both run and simulate
+    program = VirtualMachine.compile(",.,.,.")
+    running_time, input_data, output_data = VirtualMachine.run(
+        program, ["a"], InputSource("bc"))
+    assert(input_data == ["a", "b", "c"] and output_data == ["a", "b", "c"])
+    matrices = VirtualMachine.simulate(program, ["a"], InputSource("bc"))
+    assert([row[0].value for row in matrices[3]] == [ord(c) for c in "abc"])
+
+
+def test_interpolate_columns():
+    field = BaseField.main()
+    order = 1 << 32
+    generator = field.primitive_nth_root(order)
+    num_randomizers = 12
+    program = VirtualMachine.compile("++>+++[-]")
+    processor_matrix = VirtualMachine.simulate(program)[0]
+    table = ProcessorTable(field, len(processor_matrix),
+                           num_randomizers, generator, order)
+    table.matrix = processor_matrix
+    table.pad()
+
+    polynomials = table.interpolate_columns(
+        range(table.base_width), RandomStream(bytes(32)))
+    domain = [table.omicron ^ i for i in range(table.height)]
+    for c in range(table.base_width):
+        assert(polynomials[c].evaluate_domain(domain) == [row[c] for row in table.matrix]
+               ), f"interpolant of column {c} does not match the trace"
+        assert(polynomials[c].degree() == table.interpolant_degree()
+               ), f"interpolant of column {c} has the wrong degree"
+
+    others = table.interpolate_columns(
+        range(table.base_width), RandomStream(bytes([1] * 32)))
+    assert(all(p != q for p, q in zip(polynomials, others))
+           ), "different randomness should mask the columns differently"
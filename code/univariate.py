@@ -1,23 +1,65 @@
 from algebra import *
+from functools import lru_cache
+from array import array
 
 
 class Polynomial:
+    """Univariate polynomial. Coefficients are stored without trailing
+    zeros, so the degree is known without scanning them. Polynomials over
+    the base field with p = 2^64 - 2^32 + 1 can also be held as a compact
+    array of integers, from which the coefficient elements are only built
+    when first asked for."""
+
     def __init__(self, coefficients):
-        self.coefficients = [c for c in coefficients]
+        coefficients = [c for c in coefficients]
+        while coefficients != [] and coefficients[-1].is_zero():
+            coefficients.pop()
+        self.elements = coefficients
+        self.values = None  # integer form: None = unknown, False = n/a
+        self.field = None
+
+    @staticmethod
+    def from_integers(values, field):
+        end = len(values)
+        while end > 0 and values[end-1] == 0:
+            end -= 1
+        polynomial = Polynomial([])
+        polynomial.elements = None
+        polynomial.values = array("Q", values[:end])
+        polynomial.field = field
+        return polynomial
+
+    @property
+    def coefficients(self):
+        if self.elements == None:
+            self.elements = [BaseFieldElement(v, self.field)
+                             for v in self.values]
+        return self.elements
+
+    def integers(self):
+        """Coefficients as integers, if they are all base field elements
+        of a field with large power-of-two roots of unity; else None."""
+        if self.values == None:
+            self.values = False
+            if self.elements != [] and Polynomial.has_ntt_coefficients(self.elements, self.elements[0].field):
+                self.values = array("Q", [c.value for c in self.elements])
+                self.field = self.elements[0].field
+        return self.values if self.values is not False else None
+
+    def __reduce__(self):
+        # pickle (and hash) the same way whichever form is materialized
+        return (Polynomial, (self.coefficients,))
 
     def degree(self):
-        if self.coefficients == []:
-            return -1
-        zero = self.coefficients[0].field.zero()
-        if self.coefficients == [zero] * len(self.coefficients):
-            return -1
-        maxindex = 0
-        for i in range(len(self.coefficients)):
-            if self.coefficients[i] != zero:
-                maxindex = i
-        return maxindex
+        if self.elements == None:
+            return len(self.values) - 1
+        return len(self.elements) - 1
 
     def __neg__(self):
+        values = self.integers()
+        if values != None:
+            p = self.field.p
+            return Polynomial.from_integers([(p - v) % p for v in values], self.field)
         return Polynomial([-c for c in self.coefficients])
 
     def __add__(self, other):
@@ -25,6 +67,12 @@ class Polynomial:
             return other
         elif other.degree() == -1:
             return self
+        lhs, rhs = self.integers(), other.integers()
+        if lhs != None and rhs != None and self.field.p == other.field.p:
+            p = self.field.p
+            if len(lhs) < len(rhs):
+                lhs, rhs = rhs, lhs
+            return Polynomial.from_integers([(a + b) % p for a, b in zip(lhs, rhs)] + list(lhs[len(rhs):]), self.field)
         field = self.coefficients[0].field
         coeffs = [field.zero()] * max(len(self.coefficients),
                                       len(other.coefficients))
@@ -37,18 +85,95 @@ class Polynomial:
     def __sub__(self, other):
         return self.__add__(-other)
 
+    # multiplication is schoolbook while either operand has few nonzero
+    # terms, and otherwise NTT-based over the base field (which has roots of
+    # unity of order up to 2^32) or Karatsuba over any other coefficients
+    karatsuba_threshold = 16
+    ntt_threshold = 128
+    ntt_roots = dict()  # length -> primitive root of unity, as integer
+
     def __mul__(self, other):
-        if self.coefficients == [] or other.coefficients == []:
+        if self.degree() == -1 or other.degree() == -1:
             return Polynomial([])
-        zero = self.coefficients[0].field.zero()
-        buf = [zero] * (len(self.coefficients) + len(other.coefficients) - 1)
-        for i in range(len(self.coefficients)):
-            if self.coefficients[i].is_zero():
+        lhs, rhs = self.integers(), other.integers()
+        if lhs != None and rhs != None and self.field.p == other.field.p:
+            return Polynomial.from_integers(Polynomial.multiply_integers(list(lhs), list(rhs), self.field), self.field)
+        return Polynomial(Polynomial.karatsuba(self.coefficients, other.coefficients))
+
+    def has_ntt_coefficients(coefficients, field):
+        return type(field) == BaseField and field.p == 1 + (1 << 64) - (1 << 32) and \
+            all(type(c) == BaseFieldElement for c in coefficients)
+
+    def schoolbook(lhs, rhs):
+        zero = lhs[0].field.zero()
+        buf = [zero] * (len(lhs) + len(rhs) - 1)
+        for i in range(len(lhs)):
+            if lhs[i].is_zero():
                 continue  # optimization for sparse polynomials
-            for j in range(len(other.coefficients)):
-                buf[i+j] = buf[i+j] + self.coefficients[i] * \
-                    other.coefficients[j]
-        return Polynomial(buf)
+            for j in range(len(rhs)):
+                buf[i+j] = buf[i+j] + lhs[i] * rhs[j]
+        return buf
+
+    def karatsuba(lhs, rhs):
+        if min(len(lhs), len(rhs)) <= Polynomial.karatsuba_threshold:
+            return Polynomial.schoolbook(lhs, rhs)
+        if sum(not c.is_zero() for c in lhs) <= Polynomial.karatsuba_threshold:
+            return Polynomial.schoolbook(lhs, rhs)
+
+        # lhs = l0 + x^half * l1 and rhs = r0 + x^half * r1
+        half = max(len(lhs), len(rhs)) // 2
+        zero = lhs[0].field.zero()
+        buf = [zero] * (len(lhs) + len(rhs) - 1)
+        if len(lhs) <= half or len(rhs) <= half:
+            # unbalanced: only split the longer operand
+            if len(lhs) <= half:
+                lhs, rhs = rhs, lhs
+            for offset, part in [(0, Polynomial.karatsuba(lhs[:half], rhs)), (half, Polynomial.karatsuba(lhs[half:], rhs))]:
+                for i in range(len(part)):
+                    buf[offset+i] = buf[offset+i] + part[i]
+            return buf
+
+        l0, l1, r0, r1 = lhs[:half], lhs[half:], rhs[:half], rhs[half:]
+        low = Polynomial.karatsuba(l0, r0)
+        high = Polynomial.karatsuba(l1, r1)
+        lsum = [a + b for a, b in zip(l0, l1)] + l0[len(l1):] + l1[len(l0):]
+        rsum = [a + b for a, b in zip(r0, r1)] + r0[len(r1):] + r1[len(r0):]
+        middle = Polynomial.karatsuba(lsum, rsum)
+        for i in range(len(low)):
+            buf[i] = buf[i] + low[i]
+            middle[i] = middle[i] - low[i]
+        for i in range(len(high)):
+            buf[2*half+i] = buf[2*half+i] + high[i]
+            middle[i] = middle[i] - high[i]
+        for i in range(min(len(middle), len(buf) - half)):
+            buf[half+i] = buf[half+i] + middle[i]
+        return buf
+
+    def multiply_integers(lhs, rhs, field):
+        # coefficients as integers modulo field.p
+        p = field.p
+        sparse_lhs = [(i, v) for i, v in enumerate(lhs) if v != 0]
+        sparse_rhs = [(j, v) for j, v in enumerate(rhs) if v != 0]
+        if min(len(sparse_lhs), len(sparse_rhs)) <= Polynomial.ntt_threshold:
+            buf = [0] * (len(lhs) + len(rhs) - 1)
+            for i, a in sparse_lhs:
+                for j, b in sparse_rhs:
+                    buf[i+j] += a * b
+            return [v % p for v in buf]
+
+        length = 1
+        while length < len(lhs) + len(rhs) - 1:
+            length <<= 1
+        if length not in Polynomial.ntt_roots:
+            Polynomial.ntt_roots[length] = field.primitive_nth_root(
+                length).value
+        root = Polynomial.ntt_roots[length]
+        lhs_values = integer_ntt(lhs + [0] * (length - len(lhs)), root, p)
+        rhs_values = integer_ntt(rhs + [0] * (length - len(rhs)), root, p)
+        products = integer_ntt([(a * b) % p for a, b in zip(lhs_values, rhs_values)],
+                               pow(root, p - 2, p), p)
+        length_inverse = pow(length, p - 2, p)
+        return [(v * length_inverse) % p for v in products[:len(lhs) + len(rhs) - 1]]
 
     def __truediv__(self, other):
         quo, rem = Polynomial.divide(self, other)
@@ -71,7 +196,9 @@ class Polynomial:
             return False
         if self.degree() == -1:
             return True
-        return all(self.coefficients[i] == other.coefficients[i] for i in range(min(len(self.coefficients), len(other.coefficients))))
+        if self.elements == None and other.elements == None:
+            return self.values == other.values
+        return all(self.coefficients[i] == other.coefficients[i] for i in range(len(self.coefficients)))
 
     def __neq__(self, other):
         return not self.__eq__(other)
@@ -85,36 +212,68 @@ class Polynomial:
         return "[" + ",".join(s.__str__() for s in self.coefficients) + "]"
 
     def leading_coefficient(self):
-        return self.coefficients[self.degree()]
+        return self.coefficients[-1]
 
     def divide(numerator, denominator):
         if denominator.degree() == -1:
             return None
         if numerator.degree() < denominator.degree():
             return (Polynomial([]), numerator)
+        lhs, rhs = numerator.integers(), denominator.integers()
+        if lhs != None and rhs != None and numerator.field.p == denominator.field.p:
+            field = denominator.field
+            quotient, remainder = Polynomial.divide_integers(
+                list(lhs), list(rhs), field)
+            return Polynomial.from_integers(quotient, field), Polynomial.from_integers(remainder, field)
+
         field = denominator.coefficients[0].field
-        remainder = Polynomial([n for n in numerator.coefficients])
-        quotient_coefficients = [field.zero() for i in range(
-            numerator.degree()-denominator.degree()+1)]
-        for i in range(numerator.degree()-denominator.degree()+1):
-            if remainder.degree() < denominator.degree():
-                break
-            coefficient = remainder.leading_coefficient() / denominator.leading_coefficient()
-            shift = remainder.degree() - denominator.degree()
-            subtractee = Polynomial(
-                [field.zero()] * shift + [coefficient]) * denominator
-            quotient_coefficients[shift] = coefficient
-            remainder = remainder - subtractee
-        quotient = Polynomial(quotient_coefficients)
-        return quotient, remainder
+        num = numerator.coefficients
+        den = denominator.coefficients
 
-    def is_zero(self):
-        if self.coefficients == []:
-            return True
-        for c in self.coefficients:
-            if not c.is_zero():
-                return False
-        return True
+        # long division, in place on the coefficients
+        remainder = [c for c in num]
+        quotient = [field.zero()] * (len(num) - len(den) + 1)
+        leading_inverse = den[-1].inverse()
+        for i in reversed(range(len(quotient))):
+            coefficient = remainder[i+len(den)-1] * leading_inverse
+            quotient[i] = coefficient
+            for j in range(len(den)):
+                remainder[i+j] = remainder[i+j] - coefficient * den[j]
+        return Polynomial(quotient), Polynomial(remainder[:len(den)-1])
+
+    # above this many quotient and divisor coefficients, division over the
+    # base field multiplies by the inverse of the reversed divisor instead
+    newton_threshold = 256
+
+    def divide_integers(numerator, denominator, field):
+        # coefficients as integers modulo field.p, with nonzero leading terms
+        p = field.p
+        quotient_length = len(numerator) - len(denominator) + 1
+        if min(quotient_length, len(denominator)) <= Polynomial.newton_threshold:
+            remainder = list(numerator)
+            quotient = [0] * quotient_length
+            leading_inverse = pow(denominator[-1], p - 2, p)
+            for i in reversed(range(quotient_length)):
+                coefficient = (remainder[i+len(denominator)-1]
+                               * leading_inverse) % p
+                quotient[i] = coefficient
+                if coefficient != 0:
+                    for j in range(len(denominator)):
+                        remainder[i+j] = (remainder[i+j] -
+                                          coefficient * denominator[j]) % p
+            return quotient, remainder[:len(denominator)-1]
+
+        # with rev(f) = x^deg(f) * f(1/x), the quotient is the reverse of
+        # rev(numerator) / rev(denominator) mod x^quotient_length
+        inverse = series_inverse(
+            tuple(denominator[::-1]), quotient_length, field)
+        reversed_quotient = Polynomial.multiply_integers(
+            numerator[::-1][:quotient_length], list(inverse), field)[:quotient_length]
+        quotient = reversed_quotient[::-1]
+        product = Polynomial.multiply_integers(quotient, denominator, field)
+        remainder = [(a - b) % p for a, b in zip(numerator[:len(denominator)-1],
+                                                 product[:len(denominator)-1])]
+        return quotient, remainder
 
     def interpolate_domain(domain, values):
         assert(len(domain) == len(
@@ -166,7 +325,13 @@ class Polynomial:
         return acc
 
     def scale(self, factor):
-        return Polynomial([(factor ^ i) * self.coefficients[i] for i in range(len(self.coefficients))])
+        # the powers of factor are accumulated by multiplication
+        coefficients = []
+        power = factor.field.one()
+        for c in self.coefficients:
+            coefficients += [power * c]
+            power = power * factor
+        return Polynomial(coefficients)
 
     def xgcd(x, y):
         one = Polynomial([x.coefficients[0].field.one()])
@@ -187,6 +352,61 @@ class Polynomial:
         return Polynomial([c*lcinv for c in old_s.coefficients]), Polynomial([c*lcinv for c in old_t.coefficients]), Polynomial([c*lcinv for c in old_r.coefficients])
 
 
+@lru_cache(maxsize=16)
+def series_inverse(coefficients, precision, field):
+    """Power series inverse of `coefficients` (integers modulo field.p,
+    nonzero constant term) modulo x^precision, by Newton iteration
+    g <- g * (2 - f * g), which doubles the precision every step. Only the
+    most recent divisors are cached: enough for a divisor that is reused
+    back to back, while large divisors and their inverses do not stay in
+    memory for the life of the process."""
+    p = field.p
+    inverse = [pow(coefficients[0], p - 2, p)]
+    length = 1
+    while length < precision:
+        length = min(2 * length, precision)
+        error = Polynomial.multiply_integers(
+            list(coefficients[:length]), inverse, field)[:length]
+        correction = [(-e) % p for e in error]
+        correction[0] = (correction[0] + 2) % p
+        inverse = Polynomial.multiply_integers(
+            inverse, correction, field)[:length]
+    return tuple(inverse + [0] * (precision - len(inverse)))
+
+
+def integer_ntt(values, root, p):
+    """Number-theoretic transform of `values`, integers modulo p, where
+    `root` is a primitive len(values)-th root of unity; iterative radix-2
+    on plain integers."""
+    n = len(values)
+    values = list(values)
+    # bit-reversal permutation
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j ^= bit
+        if i < j:
+            values[i], values[j] = values[j], values[i]
+    length = 2
+    while length <= n:
+        half = length // 2
+        step = pow(root, n // length, p)
+        twiddles = [1] * half
+        for k in range(1, half):
+            twiddles[k] = (twiddles[k-1] * step) % p
+        for start in range(0, n, length):
+            for k in range(half):
+                u = values[start+k]
+                v = (values[start+k+half] * twiddles[k]) % p
+                values[start+k] = (u + v) % p
+                values[start+k+half] = (u - v) % p
+        length <<= 1
+    return values
+
+
 def test_colinearity(points):
     domain = [p[0] for p in points]
     values = [p[1] for p in points]
@@ -0,0 +1,80 @@
+from functools import reduce
+import pickle
+
+
+class VerifyingKey:
+    """Static data about the shape of a computational integrity claim:
+    the FRI domain parameters, the degree bounds and shift exponents of every
+    codeword in the nonlinear combination, and the layout of the quotients.
+    A key is derived once per (program, running time, memory length, number
+    of input symbols, number of output symbols) and can be stored on disk, so
+    that setting up a verifier does not require any polynomial algebra."""
+
+    def __init__(self, identifier, parameters, max_degree, fri_domain_length, base_degree_bounds, extension_degree_bounds, table_quotient_degree_bounds, permutation_quotient_degree_bounds):
+        self.identifier = identifier
+        self.parameters = parameters
+        self.max_degree = max_degree
+        self.fri_domain_length = fri_domain_length
+
+        self.base_degree_bounds = base_degree_bounds
+        self.extension_degree_bounds = extension_degree_bounds
+        # per table: (boundary, transition, terminal) quotient degree bounds
+        self.table_quotient_degree_bounds = table_quotient_degree_bounds
+        self.permutation_quotient_degree_bounds = permutation_quotient_degree_bounds
+        self.quotient_degree_bounds = reduce(
+            lambda x, y: x+y, [b + t + e for b, t, e in table_quotient_degree_bounds], []) + permutation_quotient_degree_bounds
+
+        # shift exponents lifting each codeword to max_degree
+        self.base_shifts = [max_degree - b for b in base_degree_bounds]
+        self.extension_shifts = [
+            max_degree - b for b in extension_degree_bounds]
+        self.quotient_shifts = [
+            max_degree - b for b in self.quotient_degree_bounds]
+
+    @staticmethod
+    def identify(program, running_time, memory_length, num_input_symbols, num_output_symbols):
+        return (tuple(p.value for p in program), running_time, memory_length, num_input_symbols, num_output_symbols)
+
+    @staticmethod
+    def derive(stark):
+        """Compute the key for `stark`, whose tables and parameters must be
+        set up already."""
+        # Using one() here might lead to syzygies in weird edge cases,
+        # but that shouldn't be the case for Brainfuck though.
+        challenges = [stark.xfield.one()] * 11
+        terminals = [stark.xfield.one()] * 5
+
+        base_degree_bounds = reduce(
+            lambda x, y: x+y, [[table.interpolant_degree()] * table.base_width for table in stark.tables], [])
+        extension_degree_bounds = reduce(lambda x, y: x+y, [[table.interpolant_degree()] * (
+            table.full_width - table.base_width) for table in stark.tables], [])
+        table_quotient_degree_bounds = [(table.boundary_quotient_degree_bounds(challenges),
+                                         table.transition_quotient_degree_bounds(
+                                             challenges),
+                                         table.terminal_quotient_degree_bounds(challenges, terminals)) for table in stark.tables]
+        permutation_quotient_degree_bounds = [
+            pa.quotient_degree_bound() for pa in stark.permutation_arguments]
+
+        # the transition quotients determine the fri domain length
+        max_degree = 1
+        for boundary, transition, terminal in table_quotient_degree_bounds:
+            max_degree = max([max_degree] + transition)
+        max_degree = stark.roundup_npo2(max_degree) - 1
+        fri_domain_length = (max_degree+1) * stark.expansion_factor
+
+        identifier = VerifyingKey.identify(stark.program, stark.running_time, stark.memory_length, len(
+            stark.input_symbols), len(stark.output_symbols))
+        return VerifyingKey(identifier, stark.parameters(), max_degree, fri_domain_length, base_degree_bounds, extension_degree_bounds, table_quotient_degree_bounds, permutation_quotient_degree_bounds)
+
+    def save(self, filename):
+        fh = open(filename, "wb")
+        pickle.dump(self, fh)
+        fh.close()
+
+    @staticmethod
+    def load(filename):
+        fh = open(filename, "rb")
+        key = pickle.load(fh)
+        fh.close()
+        assert (type(key) == VerifyingKey), f"{filename} does not contain a verifying key"
+        return key
@@ -3,6 +3,7 @@ from io_table import IOTable
 from instruction_table import InstructionTable
 from memory_table import MemoryTable
 from multivariate import *
+from evaluation_argument import evaluation_terminal, program_terminal
 import sys
 
 from processor_table import ProcessorTable
@@ -54,6 +55,66 @@ class _GetchWindows:
 getch = _Getch()
 
 
+class InputSource:
+    """Symbols for the `,` instruction, read in bulk from `stream`: a
+    bytes or str object, a file object or memory-mapped file (anything
+    with `read`), or an iterable of chunks. Bytes are taken as symbols with
+    the same values. Reading past the end of the input is an error, so a
+    program never waits for a terminal."""
+
+    def __init__(self, stream, buffer_length=1 << 16):
+        if type(stream) in [bytes, bytearray, memoryview, str]:
+            self.chunks = iter([stream])
+        elif hasattr(stream, "read"):
+            self.chunks = InputSource.read_chunks(stream, buffer_length)
+        else:
+            self.chunks = iter(stream)
+        self.buffer = ""
+        self.position = 0
+
+    @staticmethod
+    def read_chunks(stream, buffer_length):
+        while True:
+            chunk = stream.read(buffer_length)
+            if len(chunk) == 0:
+                return
+            yield chunk
+
+    def fill(self):
+        # move on to the next nonempty chunk, if there is one
+        for chunk in self.chunks:
+            if type(chunk) == int:
+                chunk = chr(chunk)
+            elif type(chunk) != str:
+                chunk = bytes(chunk).decode("latin-1")
+            if len(chunk) != 0:
+                self.buffer = chunk
+                self.position = 0
+                return True
+        return False
+
+    def read(self):
+        if self.position == len(self.buffer) and not self.fill():
+            assert(False), "program reads past the end of its input"
+        char = self.buffer[self.position]
+        self.position += 1
+        return char
+
+
+class TerminalInput:
+    # reads one key at a time, without echo
+    def read(self):
+        return getch()
+
+
+def default_input_source():
+    # interactive sessions read keys from the terminal; batch jobs without
+    # one read standard input in bulk
+    if sys.stdin.isatty():
+        return TerminalInput()
+    return InputSource(sys.stdin.buffer)
+
+
 class Register:
     field = BaseField.main()
 
@@ -81,7 +142,7 @@ class VirtualMachine:
         field = VirtualMachine.field
         zero = field.zero()
         one = field.one()
-        def F(x): return BaseFieldElement(ord(x), field)
+        def F(x): return field(ord(x))
 
         # parser
         program = []
@@ -97,23 +158,27 @@ class VirtualMachine:
                 stack += [len(program) - 1]
             elif symbol == ']':
                 # record loop's end
-                program += [BaseFieldElement(stack[-1] + 1, field)]
+                program += [field(stack[-1] + 1)]
                 # record loop's beginning
-                program[stack[-1]] = BaseFieldElement(len(program), field)
+                program[stack[-1]] = field(len(program))
                 stack = stack[:-1]
 
         return program
 
-    def run(program, input_data=[]):
+    def run(program, input_data=[], input_source=None):
+        """Run `program`. Symbols for `,` are taken from `input_data`
+        first and then from `input_source`, by default the terminal, or
+        standard input if there is no terminal. Returns all symbols read."""
         # shorthands
         field = VirtualMachine.field
         zero = field.zero()
         one = field.one()
-        def F(x): return BaseFieldElement(ord(x), field)
+        def F(x): return field(ord(x))
 
         # initial state
         instruction_pointer = 0
-        memory_pointer = BaseFieldElement(0, VirtualMachine.field)
+        memory_pointer = field.zero()
+        input_data = list(input_data)
         memory = dict()  # field elements to field elements
         output_data = []
         input_counter = 0
@@ -148,14 +213,13 @@ class VirtualMachine:
                 output_data += chr(int(memory[memory_pointer].value % 256))
             elif program[instruction_pointer] == F(','):
                 instruction_pointer += 1
-                if input_counter < len(input_data):
-                    char = input_data[input_counter]
-                    input_counter += 1
-                else:
-                    char = getch()
-                    input_data += [char]
-                    input_counter += 1
-                memory[memory_pointer] = BaseFieldElement(ord(char), field)
+                if input_counter == len(input_data):
+                    if input_source == None:
+                        input_source = default_input_source()
+                    input_data += [input_source.read()]
+                char = input_data[input_counter]
+                input_counter += 1
+                memory[memory_pointer] = field(ord(char))
             else:
                 assert (
                     False), f"unrecognized instruction at {instruction_pointer}: {program[instruction_pointer].value}"
@@ -170,13 +234,13 @@ class VirtualMachine:
     '''
 
     @staticmethod
-    def simulate(program, input_data=[]):
+    def simulate(program, input_data=[], input_source=None):
         # shorthands
         field = VirtualMachine.field
         zero = field.zero()
         one = field.one()
-        two = BaseFieldElement(2, field)
-        def F(x): return BaseFieldElement(ord(x), field)
+        two = field(2)
+        def F(x): return field(ord(x))
 
         # initial state
         register = Register()
@@ -191,9 +255,8 @@ class VirtualMachine:
 
         # prepare tables
         processor_matrix = []
-        instruction_matrix = [[BaseFieldElement(i, field), program[i], program[i+1]] for i in range(len(program)-1)] + \
-            [[BaseFieldElement(
-                len(program)-1, field), program[-1], field.zero()]]
+        instruction_matrix = [[field(i), program[i], program[i+1]] for i in range(len(program)-1)] + \
+            [[field(len(program)-1), program[-1], field.zero()]]
 
         input_matrix = []
         output_matrix = []
@@ -253,13 +316,14 @@ class VirtualMachine:
 
             elif register.current_instruction == F(','):
                 register.instruction_pointer += one
-                if input_data:
+                if input_counter < len(input_data):
                     char = input_data[input_counter]
-                    input_counter += 1
                 else:
-                    char = getch()
-                memory[register.memory_pointer] = BaseFieldElement(
-                    ord(char), field)
+                    if input_source == None:
+                        input_source = default_input_source()
+                    char = input_source.read()
+                input_counter += 1
+                memory[register.memory_pointer] = field(ord(char))
                 input_matrix += [[memory[register.memory_pointer]]]
 
             else:
@@ -311,37 +375,11 @@ class VirtualMachine:
 
     @ staticmethod
     def evaluation_terminal(vector, alpha):
-        xfield = alpha.field
-        acc = xfield.zero()
-        for v in vector:
-            acc = alpha * acc + xfield.lift(v)
-        return acc
+        return evaluation_terminal(vector, alpha)
 
     @ staticmethod
     def program_evaluation(program, a, b, c, eta):
-        field = program[0].field
-        xfield = a.field
-        running_sum = xfield.zero()
-        previous_address = -xfield.one()
-        padded_program = [xfield.lift(p)
-                          for p in program] + [xfield.zero()]
-        for i in range(len(padded_program)-1):
-            address = xfield.lift(BaseFieldElement(i, field))
-            current_instruction = padded_program[i]
-            next_instruction = padded_program[i+1]
-            if previous_address != address:
-                running_sum = running_sum * eta + a * address + \
-                    b * current_instruction + c * next_instruction
-            previous_address = address
-
-        index = len(padded_program)-1
-        address = xfield.lift(BaseFieldElement(index, field))
-        current_instruction = padded_program[index]
-        next_instruction = xfield.zero()
-        running_sum = running_sum * eta + a * address + \
-            b * current_instruction + c * next_instruction
-
-        return running_sum
+        return program_terminal(program, a, b, c, eta)
 
     # @ staticmethod
     # def program_permutation_cofactor(program, a, b, c, alpha, initial_value=None):